@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_save
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        """После сохранения запрос читает из основной базы.
+        На post_delete для всех моделей не подписываемся: Django
+        тогда перестает удалять каскадом одним запросом.
+        """
+        from .routers import read_own_writes
+        post_save.connect(read_own_writes, dispatch_uid='read_own_writes')
@@ -0,0 +1,167 @@
+import asyncio
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from tempfile import SpooledTemporaryFile
+
+import django
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+# тело запроса больше этого размера уходит из памяти во временный файл
+BODY_MEMORY_LIMIT = 1024 * 1024
+
+
+class Disconnected(Exception):
+    """клиент ушел, не дослав тело запроса"""
+
+
+def _latin1(value):
+    return value.encode('utf-8').decode('latin-1')
+
+
+def build_environ(scope, body):
+    """окружение WSGI для HTTP-запроса ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': _latin1(scope.get('root_path', '')),
+        'PATH_INFO': _latin1(scope['path']),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': 'HTTP/' + scope.get('http_version', '1.1'),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'], environ['REMOTE_PORT'] = (
+            scope['client'][0], str(scope['client'][1])
+        )
+    for name, value in scope.get('headers', ()):
+        name, value = name.decode('latin-1'), value.decode('latin-1')
+        if name == 'content-length':
+            key = 'CONTENT_LENGTH'
+        elif name == 'content-type':
+            key = 'CONTENT_TYPE'
+        else:
+            key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in environ:
+            separator = '; ' if key == 'HTTP_COOKIE' else ','
+            value = environ[key] + separator + value
+        environ[key] = value
+    return environ
+
+
+class WsgiToAsgi:
+    """ASGI-приложение поверх WSGI-приложения.
+    Тело запроса читается и ответ отправляется в цикле событий,
+    поэтому медленный клиент не держит поток. Сам WSGI-обработчик
+    (views, запросы к базе) выполняется в пуле из workers потоков.
+    Потоковые ответы (экспорт) отдаются из того же потока, что их
+    создал: курсор и соединение с базой принадлежат ему.
+    """
+
+    def __init__(self, wsgi_application, workers=None):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Неподдерживаемое соединение: {scope["type"]}')
+        try:
+            body = await self.read_body(receive)
+        except Disconnected:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            response = await loop.run_in_executor(
+                self.executor, self.run_wsgi,
+                build_environ(scope, body), loop, send
+            )
+        finally:
+            body.close()
+        if response is None:
+            return
+        status, headers, content = response
+        await send({
+            'type': 'http.response.start', 'status': status,
+            'headers': headers,
+        })
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        body = SpooledTemporaryFile(max_size=BODY_MEMORY_LIMIT)
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                raise Disconnected
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def run_wsgi(self, environ, loop, send):
+        """Выполняется в потоке пула. Обычный ответ возвращает целиком
+        для отправки из цикла событий, потоковый отправляет сам,
+        дожидаясь отправки каждой части.
+        """
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = [
+                (name.lower().encode('latin-1'), value.encode('latin-1'))
+                for name, value in headers
+            ]
+
+        def send_now(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        result = self.wsgi_application(environ, start_response)
+        try:
+            if not getattr(result, 'streaming', False):
+                content = b''.join(result)
+                return started['status'], started['headers'], content
+            send_now({
+                'type': 'http.response.start', 'status': started['status'],
+                'headers': started['headers'],
+            })
+            for chunk in result:
+                if chunk:
+                    send_now({
+                        'type': 'http.response.body', 'body': chunk,
+                        'more_body': True,
+                    })
+            send_now({'type': 'http.response.body', 'body': b''})
+            return None
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+
+
+def get_asgi_application():
+    """ASGI-приложение проекта, аналог get_wsgi_application"""
+    django.setup(set_prefix=False)
+    return WsgiToAsgi(WSGIHandler(), workers=settings.ASGI_THREADS)
@@ -0,0 +1,379 @@
+import pickle
+import queue
+import socket
+import threading
+from urllib.parse import urlparse
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+DEFAULT_PORT: int = 6379
+DEFAULT_MAX_CONNECTIONS: int = 50
+DEFAULT_SOCKET_TIMEOUT: float = 1.0
+DEFAULT_L1_TIMEOUT: int = 5
+
+_MISSING = object()
+# incr за одну команду: между проверкой ключа и INCRBY другой клиент
+# мог бы удалить ключ, и INCRBY создал бы его заново с delta
+INCR_SCRIPT: str = (
+    "if redis.call('EXISTS', KEYS[1]) == 0 then return false end "
+    "return redis.call('INCRBY', KEYS[1], ARGV[1])"
+)
+
+
+class RespError(Exception):
+    """сервер ответил ошибкой"""
+
+
+class Connection:
+    """Соединение с сервером по протоколу Redis (RESP)."""
+
+    def __init__(self, host, port, db, timeout):
+        self.sock = socket.create_connection((host, port), timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.reader = self.sock.makefile('rb')
+        if db:
+            self.execute('SELECT', db)
+
+    def close(self):
+        self.reader.close()
+        self.sock.close()
+
+    @staticmethod
+    def _encode(args):
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode()
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _read(self):
+        line = self.reader.readline()
+        if not line:
+            raise ConnectionError('соединение закрыто сервером')
+        kind, rest = line[:1], line[1:-2]
+        if kind == b'+':
+            return rest.decode()
+        if kind == b'-':
+            raise RespError(rest.decode())
+        if kind == b':':
+            return int(rest)
+        if kind == b'$':
+            length = int(rest)
+            if length < 0:
+                return None
+            return self.reader.read(length + 2)[:-2]
+        if kind == b'*':
+            length = int(rest)
+            if length < 0:
+                return None
+            return [self._read() for _ in range(length)]
+        raise ConnectionError(f'непонятный ответ сервера: {line!r}')
+
+    def pipeline(self, commands):
+        """отправляет команды одним пакетом, читает все ответы"""
+        self.sock.sendall(b''.join(self._encode(args) for args in commands))
+        replies = []
+        error = None
+        for _ in commands:
+            try:
+                replies.append(self._read())
+            except RespError as exc:
+                error = error or exc
+                replies.append(None)
+        if error is not None:
+            raise error
+        return replies
+
+    def execute(self, *args):
+        return self.pipeline([args])[0]
+
+
+class ConnectionPool:
+    """Пул соединений, общий для всех потоков процесса.
+    Не больше max_connections соединений; если все заняты,
+    поток ждет освободившегося.
+    """
+
+    def __init__(self, host, port, db, max_connections, timeout):
+        self.host, self.port, self.db = host, port, db
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_connections)
+
+    def acquire(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise ConnectionError('нет свободных соединений в пуле')
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return Connection(self.host, self.port, self.db, self.timeout)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def release(self, connection, broken=False):
+        if broken:
+            connection.close()
+        else:
+            self._idle.put(connection)
+        self._slots.release()
+
+    def disconnect(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(location, max_connections, timeout):
+    """Пул для адреса сервера.
+    Django создает свой объект кэша в каждом потоке,
+    поэтому пулы хранятся на уровне модуля.
+    """
+    key = (location, max_connections, timeout)
+    with _pools_lock:
+        if key not in _pools:
+            url = urlparse(location)
+            _pools[key] = ConnectionPool(
+                url.hostname or '127.0.0.1',
+                url.port or DEFAULT_PORT,
+                int(url.path.strip('/') or 0),
+                max_connections,
+                timeout,
+            )
+        return _pools[key]
+
+
+class RespCache(BaseCache):
+    """Кэш на сервере с протоколом Redis.
+    Целые числа хранятся как есть, чтобы работал INCRBY,
+    остальные значения -- в pickle.
+    """
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._pool = get_pool(
+            location,
+            int(options.get('MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+            float(options.get('SOCKET_TIMEOUT', DEFAULT_SOCKET_TIMEOUT)),
+        )
+
+    def _pipeline(self, commands):
+        connection = self._pool.acquire()
+        broken = False
+        try:
+            return connection.pipeline(commands)
+        except (OSError, ConnectionError):
+            broken = True
+            raise
+        finally:
+            self._pool.release(connection, broken)
+
+    def _execute(self, *args):
+        return self._pipeline([args])[0]
+
+    def _ttl_args(self, timeout):
+        """аргументы срока жизни для SET, None -- не сохранять"""
+        if timeout == DEFAULT_TIMEOUT:
+            timeout = self.default_timeout
+        if timeout is None:
+            return []
+        milliseconds = int(timeout * 1000)
+        if milliseconds <= 0:
+            return None
+        return ['PX', milliseconds]
+
+    def _encode(self, value):
+        if type(value) is int:
+            return str(value).encode()
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(raw):
+        if raw[:1] == b'\x80':
+            return pickle.loads(raw)
+        return int(raw)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl_args(timeout)
+        if ttl is None:
+            return False
+        return self._execute(
+            'SET', self._key(key, version), self._encode(value), *ttl, 'NX'
+        ) is not None
+
+    def get(self, key, default=None, version=None):
+        raw = self._execute('GET', self._key(key, version))
+        return default if raw is None else self._decode(raw)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl_args(timeout)
+        if ttl is None:
+            self._execute('DEL', key)
+        else:
+            self._execute('SET', key, self._encode(value), *ttl)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        ttl = self._ttl_args(timeout)
+        if ttl is None:
+            return bool(self._execute('DEL', key))
+        if not ttl:
+            return bool(self._pipeline([('PERSIST', key), ('EXISTS', key)])[1])
+        return bool(self._execute('PEXPIRE', key, ttl[1]))
+
+    def delete(self, key, version=None):
+        self._execute('DEL', self._key(key, version))
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return {}
+        raw_values = self._execute(
+            'MGET', *(self._key(key, version) for key in keys)
+        )
+        return {
+            key: self._decode(raw)
+            for key, raw in zip(keys, raw_values) if raw is not None
+        }
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        ttl = self._ttl_args(timeout)
+        if ttl is None:
+            self.delete_many(data, version=version)
+            return []
+        if data:
+            self._pipeline([
+                ('SET', self._key(key, version), self._encode(value), *ttl)
+                for key, value in data.items()
+            ])
+        return []
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            self._execute('DEL', *keys)
+
+    def has_key(self, key, version=None):
+        return bool(self._execute('EXISTS', self._key(key, version)))
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        try:
+            value = self._execute('EVAL', INCR_SCRIPT, 1, key, delta)
+        except RespError:
+            raise ValueError(f"Key '{key}' is not an integer")
+        if value is None:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def clear(self):
+        self._execute('FLUSHDB')
+
+
+class TieredCache(BaseCache):
+    """Двухуровневый кэш.
+    L1 -- маленький кэш в памяти процесса, L2 -- общий кэш.
+    В L1 записи живут не дольше L1_TIMEOUT секунд: так изменения,
+    сделанные другими процессами, видны через этот срок.
+    Счетчики и блокировки (incr, add) работают через L2.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._l1_alias = options.get('L1', 'local')
+        self._l2_alias = options.get('L2', 'shared')
+        self.l1_timeout = int(options.get('L1_TIMEOUT', DEFAULT_L1_TIMEOUT))
+
+    @property
+    def l1(self):
+        return caches[self._l1_alias]
+
+    @property
+    def l2(self):
+        return caches[self._l2_alias]
+
+    def _l1_timeout(self, timeout):
+        if timeout == DEFAULT_TIMEOUT or timeout is None:
+            return self.l1_timeout
+        return min(timeout, self.l1_timeout)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.l2.add(key, value, timeout, version=version)
+        if added:
+            self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+        return added
+
+    def get(self, key, default=None, version=None):
+        value = self.l1.get(key, _MISSING, version=version)
+        if value is not _MISSING:
+            return value
+        value = self.l2.get(key, _MISSING, version=version)
+        if value is _MISSING:
+            return default
+        self.l1.set(key, value, self.l1_timeout, version=version)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l2.set(key, value, timeout, version=version)
+        self.l1.set(key, value, self._l1_timeout(timeout), version=version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        self.l1.delete(key, version=version)
+        return self.l2.touch(key, timeout, version=version)
+
+    def delete(self, key, version=None):
+        self.l1.delete(key, version=version)
+        self.l2.delete(key, version=version)
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.l1.get_many(keys, version=version)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            shared = self.l2.get_many(missing, version=version)
+            if shared:
+                self.l1.set_many(shared, self.l1_timeout, version=version)
+            found.update(shared)
+        return found
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.l2.set_many(data, timeout, version=version)
+        self.l1.set_many(data, self._l1_timeout(timeout), version=version)
+        return failed
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        self.l1.delete_many(keys, version=version)
+        self.l2.delete_many(keys, version=version)
+
+    def has_key(self, key, version=None):
+        return (self.l1.has_key(key, version=version)
+                or self.l2.has_key(key, version=version))
+
+    def incr(self, key, delta=1, version=None):
+        value = self.l2.incr(key, delta, version=version)
+        self.l1.delete(key, version=version)
+        return value
+
+    def clear(self):
+        self.l1.clear()
+        self.l2.clear()
@@ -0,0 +1,29 @@
+import threading
+
+
+class LazyExecutor:
+    """Пул потоков или процессов, который создается при первой задаче:
+    размер пула берется из настроек, уже загруженных к этому моменту.
+    factory -- функция без аргументов, возвращающая Executor.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self.factory()
+            return self._executor
+
+    def submit(self, func, *args, **kwargs):
+        return self.get().submit(func, *args, **kwargs)
+
+    def shutdown(self, wait=True):
+        """останавливает пул, следующая задача создаст новый"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
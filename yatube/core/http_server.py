@@ -0,0 +1,210 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import unquote
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+READ_CHUNK = 64 * 1024
+DEFAULT_PORT = 8000
+
+
+def _reason(status):
+    try:
+        return HTTPStatus(status).phrase
+    except ValueError:
+        return ''
+
+
+def _receiver(reader, length):
+    """receive для ASGI: тело запроса частями по READ_CHUNK"""
+    remaining = length
+
+    async def receive():
+        nonlocal remaining
+        if remaining is None:
+            return {'type': 'http.disconnect'}
+        chunk = b''
+        if remaining:
+            chunk = await reader.read(min(remaining, READ_CHUNK))
+            if not chunk:
+                remaining = None
+                return {'type': 'http.disconnect'}
+            remaining -= len(chunk)
+        more_body = remaining > 0
+        if not more_body:
+            remaining = None
+        return {'type': 'http.request', 'body': chunk, 'more_body': more_body}
+
+    return receive
+
+
+def _sender(writer):
+    """send для ASGI: ждет, пока клиент заберет отправленное"""
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            status = message['status']
+            lines = [f'HTTP/1.1 {status} {_reason(status)}']
+            lines += [
+                f'{name.decode("latin-1")}: {value.decode("latin-1")}'
+                for name, value in message.get('headers', ())
+            ]
+            lines.append('Connection: close')
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+        else:
+            writer.write(message.get('body', b''))
+        await writer.drain()
+
+    return send
+
+
+class AsgiServer:
+    """HTTP/1.1-сервер на asyncio для ASGI-приложения -- замена uvicorn
+    для разработки и замеров. Одно соединение -- один запрос.
+    Пока клиент медленно шлет запрос или читает ответ, ждет только
+    цикл событий, потоки приложения свободны.
+    """
+
+    def __init__(self, app, host='127.0.0.1', port=DEFAULT_PORT):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.ready = threading.Event()
+        self.loop = None
+        self.stopped = None
+        self.thread = None
+
+    @property
+    def location(self):
+        return f'http://{self.host}:{self.port}'
+
+    async def lifespan(self, messages, replies, event):
+        await messages.put({'type': f'lifespan.{event}'})
+        reply = await replies.get()
+        if reply['type'] != f'lifespan.{event}.complete':
+            raise RuntimeError(reply.get('message', event))
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        messages, replies = asyncio.Queue(), asyncio.Queue()
+        lifespan = asyncio.ensure_future(self.app(
+            {'type': 'lifespan', 'asgi': {'version': '3.0'}},
+            messages.get, replies.put
+        ))
+        await self.lifespan(messages, replies, 'startup')
+        server = await asyncio.start_server(
+            self.handle, self.host, self.port, backlog=1024
+        )
+        self.port = server.sockets[0].getsockname()[1]
+        self.ready.set()
+        async with server:
+            await self.stopped.wait()
+        await self.lifespan(messages, replies, 'shutdown')
+        await lifespan
+
+    def serve_forever(self):
+        asyncio.run(self.serve())
+
+    def start(self):
+        """запускает сервер в фоновом потоке"""
+        self.thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        return self.thread
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join()
+
+    async def handle(self, reader, writer):
+        try:
+            scope, length = await self.read_head(reader, writer)
+        except (ValueError, IndexError, ConnectionError):
+            writer.close()
+            return
+        try:
+            await self.app(scope, _receiver(reader, length), _sender(writer))
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def read_head(self, reader, writer):
+        """scope запроса по строке запроса и заголовкам"""
+        line = await reader.readline()
+        method, target, version = line.decode('latin-1').split()
+        headers = []
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers.append((
+                name.strip().lower().encode('latin-1'),
+                value.strip().encode('latin-1'),
+            ))
+        path, _, query = target.partition('?')
+        client = writer.get_extra_info('peername')
+        scope = {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': version.split('/', 1)[1],
+            'method': method,
+            'scheme': 'http',
+            'path': unquote(path),
+            'raw_path': path.encode('latin-1'),
+            'query_string': query.encode('latin-1'),
+            'root_path': '',
+            'headers': headers,
+            'client': client[:2] if client else None,
+            'server': (self.host, self.port),
+        }
+        return scope, int(dict(headers).get(b'content-length', 0))
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер с постоянным числом потоков, как синхронные
+    воркеры gunicorn: поток занят запросом, пока клиент его шлет.
+    """
+    request_queue_size = 1024
+
+    def __init__(self, app, threads, host='127.0.0.1', port=DEFAULT_PORT):
+        super().__init__((host, port), QuietHandler)
+        self.set_app(app)
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='wsgi'
+        )
+
+    @property
+    def location(self):
+        host, port = self.server_address
+        return f'http://{host}:{port}'
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_in_thread, request, client_address)
+
+    def process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def start(self):
+        """запускает сервер в фоновом потоке"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.asgi import get_asgi_application
+from core.http_server import DEFAULT_PORT, AsgiServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает сайт через ASGI на встроенном сервере asyncio'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    def handle(self, *args, **options):
+        server = AsgiServer(
+            get_asgi_application(), options['host'], options['port']
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Сайт (ASGI) слушает {server.location}')
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from core.cache import DEFAULT_PORT
+from core.resp_server import RespServer
+
+
+class Command(BaseCommand):
+    help = 'Запускает локальную замену Redis для кэша'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+
+    def handle(self, *args, **options):
+        server = RespServer(options['host'], options['port'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Сервер кэша слушает {server.location}')
+        )
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
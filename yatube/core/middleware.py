@@ -0,0 +1,238 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.db import connections
+
+from .routers import read_replica
+
+logger = logging.getLogger(__name__)
+
+# замеры текущего запроса; gather переносит их в потоки пула
+_profile = ContextVar('profile', default=None)
+_MISSING = object()
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class RequestProfile:
+    """Замеры одного запроса: SQL, шаблоны и кэш.
+    Запросы из потоков пула складываются сюда же, время базы
+    -- сумма по всем потокам.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    def duplicates(self):
+        """повторяющиеся запросы: признак N+1"""
+        threshold = settings.PROFILING_DUPLICATE_THRESHOLD
+        return {
+            sql: count for sql, count in self.queries.most_common()
+            if count >= threshold
+        }
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self.lock:
+                self.db_time += time.perf_counter() - start
+                self.queries[sql] += 1
+
+    def count_cache(self, hits, misses):
+        with self.lock:
+            self.cache_hits += hits
+            self.cache_misses += misses
+
+
+def render_profiled(render, *args):
+    """Отрисовка шаблона с замером времени в профиле текущего запроса.
+    Вложенные отрисовки учитываются внутри внешней.
+    """
+    profile = _profile.get()
+    if profile is None or profile.template_depth:
+        return render(*args)
+    profile.template_depth += 1
+    start = time.perf_counter()
+    try:
+        return render(*args)
+    finally:
+        profile.template_time += time.perf_counter() - start
+        profile.template_depth -= 1
+
+
+def _profiled_cache(backend, profile):
+    """подменяет get и get_many бэкенда кэша на считающие попадания"""
+    get, get_many = backend.get, backend.get_many
+
+    def profiled_get(key, default=None, version=None):
+        value = get(key, _MISSING, version=version)
+        if value is _MISSING:
+            profile.count_cache(0, 1)
+            return default
+        profile.count_cache(1, 0)
+        return value
+
+    def profiled_get_many(keys, version=None):
+        keys = list(keys)
+        values = get_many(keys, version=version)
+        profile.count_cache(len(values), len(keys) - len(values))
+        return values
+
+    backend.get, backend.get_many = profiled_get, profiled_get_many
+
+
+@contextmanager
+def _capture(profile):
+    """Считает SQL и кэш текущего потока в profile.
+    Соединения и бэкенды кэша у каждого потока свои.
+    """
+    backend = caches[DEFAULT_CACHE_ALIAS]
+    # вложенные замеры: на выходе возвращается подмена внешнего
+    patched = {
+        name: vars(backend)[name] for name in ('get', 'get_many')
+        if name in vars(backend)
+    }
+    _profiled_cache(backend, profile)
+    wrappers = [
+        connection.execute_wrapper(profile.record_query)
+        for connection in connections.all()
+    ]
+    for wrapper in wrappers:
+        wrapper.__enter__()
+    try:
+        yield
+    finally:
+        for wrapper in reversed(wrappers):
+            wrapper.__exit__(None, None, None)
+        del backend.get, backend.get_many
+        vars(backend).update(patched)
+
+
+@contextmanager
+def profiling(profile):
+    """замеры блока в profile, включая задачи, отданные gather в пул"""
+    token = _profile.set(profile)
+    try:
+        with _capture(profile):
+            yield
+    finally:
+        _profile.reset(token)
+
+
+@contextmanager
+def profiled_thread():
+    """в потоке пула: если запрос профилируется, считает и его запросы"""
+    profile = _profile.get()
+    if profile is None:
+        yield
+        return
+    with _capture(profile):
+        yield
+
+
+class ProfilingMiddleware:
+    """Профилирование части запросов.
+    Для выбранного с вероятностью PROFILING_SAMPLE_RATE запроса
+    считает число и время SQL-запросов, повторы запросов, время
+    отрисовки шаблонов (их замеряет бэкенд core.templates),
+    попадания в кэш, добавляет заголовок Server-Timing и пишет
+    строку JSON в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if random.random() >= settings.PROFILING_SAMPLE_RATE:
+            return self.get_response(request)
+        profile = RequestProfile()
+        start = time.perf_counter()
+        with profiling(profile):
+            response = self.get_response(request)
+        total = time.perf_counter() - start
+        response['Server-Timing'] = self.server_timing(profile, total)
+        self.log(request, response, profile, total)
+        return response
+
+    @staticmethod
+    def server_timing(profile, total):
+        return ', '.join([
+            f'db;dur={profile.db_time * 1000:.1f};'
+            f'desc="{profile.query_count} queries"',
+            f'tpl;dur={profile.template_time * 1000:.1f}',
+            f'cache;desc="{profile.cache_hits} hits '
+            f'{profile.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ])
+
+    @staticmethod
+    def log(request, response, profile, total):
+        duplicates = profile.duplicates()
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total * 1000, 2),
+            'db_ms': round(profile.db_time * 1000, 2),
+            'queries': profile.query_count,
+            'duplicate_queries': duplicates,
+            'template_ms': round(profile.template_time * 1000, 2),
+            'cache_hits': profile.cache_hits,
+            'cache_misses': profile.cache_misses,
+        }
+        level = logging.WARNING if duplicates else logging.INFO
+        logger.log(level, json.dumps(record, ensure_ascii=False))
+
+
+class ReplicaMiddleware:
+    """Страницы из REPLICA_VIEWS читают с одной случайной реплики.
+    После изменяющего запроса (POST и т. п.) ставится кука, и пока
+    она жива, страницы пользователя читаются из основной базы:
+    реплика может еще не получить его изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        token = getattr(request, '_replica_token', None)
+        if token is not None:
+            read_replica.reset(token)
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            settings.DATABASE_REPLICAS
+            and request.method in SAFE_METHODS
+            and request.resolver_match.view_name in settings.REPLICA_VIEWS
+            and settings.REPLICA_STICKY_COOKIE not in request.COOKIES
+        ):
+            request._replica_token = read_replica.set(
+                random.choice(settings.DATABASE_REPLICAS)
+            )
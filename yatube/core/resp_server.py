@@ -0,0 +1,192 @@
+import socketserver
+import threading
+import time
+
+from .cache import DEFAULT_PORT, INCR_SCRIPT
+
+
+class Store:
+    """Данные сервера: значения и сроки их жизни."""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+        self.lock = threading.Lock()
+
+    def alive(self, key):
+        expires = self.expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def put(self, key, value, ttl_ms=None):
+        self.data[key] = value
+        if ttl_ms is None:
+            self.expires.pop(key, None)
+        else:
+            self.expires[key] = time.monotonic() + ttl_ms / 1000
+
+    def remove(self, key):
+        self.expires.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+
+class Error(Exception):
+    """ошибка команды, уходит клиенту ответом '-'"""
+
+
+def _set(store, key, value, *options):
+    options = [option.upper() for option in options]
+    ttl = None
+    for name, factor in ((b'EX', 1000), (b'PX', 1)):
+        if name in options:
+            ttl = int(options[options.index(name) + 1]) * factor
+    if b'NX' in options and store.alive(key):
+        return None
+    store.put(key, value, ttl)
+    return 'OK'
+
+
+def _incrby(store, key, delta):
+    value = store.data.get(key, b'0') if store.alive(key) else b'0'
+    try:
+        value = int(value) + int(delta)
+    except ValueError:
+        raise Error('ERR value is not an integer or out of range')
+    store.data[key] = str(value).encode()
+    return value
+
+
+def _pexpire(store, key, ttl):
+    if not store.alive(key):
+        return 0
+    store.expires[key] = time.monotonic() + int(ttl) / 1000
+    return 1
+
+
+def _persist(store, key):
+    return int(store.alive(key) and store.expires.pop(key, None) is not None)
+
+
+def _incr_existing(store, keys, args):
+    """INCR_SCRIPT: INCRBY только для существующего ключа"""
+    if not store.alive(keys[0]):
+        return None
+    return _incrby(store, keys[0], args[0])
+
+
+# Lua на сервере не выполняется: известные скрипты RespCache
+# заменены функциями на Python, выполняемыми под блокировкой хранилища
+SCRIPTS = {
+    INCR_SCRIPT.encode(): _incr_existing,
+}
+
+
+def _eval(store, script, key_count, *args):
+    function = SCRIPTS.get(script)
+    if function is None:
+        raise Error('NOSCRIPT unknown script')
+    key_count = int(key_count)
+    return function(store, args[:key_count], args[key_count:])
+
+
+def _flush(store):
+    store.data.clear()
+    store.expires.clear()
+    return 'OK'
+
+
+COMMANDS = {
+    b'PING': lambda store: 'PONG',
+    b'SELECT': lambda store, db: 'OK',
+    b'GET': lambda store, key: (
+        store.data[key] if store.alive(key) else None
+    ),
+    b'MGET': lambda store, *keys: [
+        store.data[key] if store.alive(key) else None for key in keys
+    ],
+    b'SET': _set,
+    b'DEL': lambda store, *keys: sum(store.remove(key) for key in keys),
+    b'EXISTS': lambda store, *keys: sum(store.alive(key) for key in keys),
+    b'INCRBY': _incrby,
+    b'PEXPIRE': _pexpire,
+    b'PERSIST': _persist,
+    b'FLUSHDB': _flush,
+    b'EVAL': _eval,
+}
+
+
+def encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, Error):
+        return b'-%s\r\n' % str(reply).encode()
+    if isinstance(reply, str):
+        return b'+%s\r\n' % reply.encode()
+    if isinstance(reply, int):
+        return b':%d\r\n' % reply
+    if isinstance(reply, list):
+        return b'*%d\r\n' % len(reply) + b''.join(map(encode, reply))
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """читает команды RESP и отвечает на них"""
+
+    def read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        count = int(line[1:-2])
+        args = []
+        for _ in range(count):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+    def handle(self):
+        store = self.server.store
+        while True:
+            args = self.read_command()
+            if args is None:
+                return
+            command = COMMANDS.get(args[0].upper())
+            try:
+                if command is None:
+                    raise Error(f'ERR unknown command {args[0]!r}')
+                with store.lock:
+                    reply = command(store, *args[1:])
+            except TypeError:
+                reply = Error('ERR wrong number of arguments')
+            except Error as exc:
+                reply = exc
+            self.wfile.write(encode(reply))
+
+
+class RespServer(socketserver.ThreadingTCPServer):
+    """Локальная замена Redis для разработки и тестов.
+    Понимает только команды, которые использует core.cache.RespCache,
+    и хранит данные в памяти процесса.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host='127.0.0.1', port=DEFAULT_PORT):
+        super().__init__((host, port), Handler)
+        self.store = Store()
+
+    @property
+    def location(self):
+        host, port = self.server_address
+        return f'redis://{host}:{port}/0'
+
+    def start(self):
+        """запускает сервер в фоновом потоке"""
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# реплика, с которой читает текущий запрос (None -- основная база).
+# Одна на весь запрос: у реплик разное отставание, и страница,
+# собранная с нескольких, могла бы оказаться несогласованной.
+# Ставит ReplicaMiddleware.
+read_replica = ContextVar('read_replica', default=None)
+
+
+@contextmanager
+def primary():
+    """чтение внутри блока идет из основной базы"""
+    token = read_replica.set(None)
+    try:
+        yield
+    finally:
+        read_replica.reset(token)
+
+
+def read_own_writes(sender, **kwargs):
+    """после сохранения модели запрос дочитывает данные из основной
+    базы: реплика еще не получила изменений
+    """
+    read_replica.set(None)
+
+
+class ReplicaRouter:
+    """Чтение моделей из REPLICA_APPS -- с реплики, выбранной для
+    текущего запроса. Запись всегда идет в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = read_replica.get()
+        if (
+            replica is not None
+            and model._meta.app_label in settings.REPLICA_APPS
+        ):
+            return replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= databases:
+            return True
+        return None
@@ -0,0 +1,48 @@
+from django.db.backends.sqlite3 import base
+
+# значения по умолчанию, их можно переопределить в OPTIONS['pragmas']
+DEFAULT_PRAGMAS = {
+    # запись не блокирует чтение, читатели не блокируют запись
+    'journal_mode': 'WAL',
+    # в режиме WAL fsync нужен только при контрольной точке
+    'synchronous': 'NORMAL',
+    # сколько миллисекунд ждать снятия блокировки, а не падать
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    # отрицательное значение -- размер в КиБ
+    'cache_size': -64 * 1024,
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """SQLite, настроенный для одновременных запросов.
+    На каждом новом соединении выполняются PRAGMA из OPTIONS['pragmas'].
+    Транзакции начинаются с BEGIN IMMEDIATE (OPTIONS['transaction_mode']):
+    блокировка записи берется сразу, и транзакция, начавшая с чтения,
+    не получает "database is locked" при попытке записи, а ждет
+    в пределах busy_timeout.
+    """
+
+    def get_connection_params(self):
+        options = self.settings_dict['OPTIONS']
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        self.transaction_mode = options.get('transaction_mode', 'IMMEDIATE')
+        return params
+
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        if self.is_in_memory_db():
+            return connection
+        for name, value in self.pragmas.items():
+            connection.execute(f'PRAGMA {name} = {value}')
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        # у базы в памяти (тесты) общий кэш с блокировками таблиц:
+        # WAL и busy_timeout к ней не относятся, работает как обычно
+        if self.is_in_memory_db():
+            return super()._start_transaction_under_autocommit()
+        self.cursor().execute(f'BEGIN {self.transaction_mode}')
@@ -0,0 +1,27 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends import django
+
+from .middleware import render_profiled
+
+
+class Template(django.Template):
+    """шаблон, время отрисовки которого попадает в профиль запроса"""
+
+    def render(self, context=None, request=None):
+        return render_profiled(super().render, context, request)
+
+
+class DjangoTemplates(django.DjangoTemplates):
+    """Шаблоны Django с замером времени отрисовки для
+    ProfilingMiddleware. Замер включается только в профилируемом
+    запросе, классы Django не подменяются.
+    """
+
+    def from_string(self, template_code):
+        return Template(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return Template(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            django.reraise(exc, self)
@@ -1,6 +1,23 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
-from .models import Post, Group
+from . import exporter
+from .models import Comment, Follow, Group, Post
+
+
+def export_action(name):
+    """действие админки: потоковая выгрузка выбранных строк в jsonl.gz"""
+    def export_selected(modeladmin, request, queryset):
+        response = StreamingHttpResponse(
+            exporter.stream(name, 'jsonl', compress=True, queryset=queryset),
+            content_type='application/gzip',
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{exporter.filename(name, "jsonl", True)}"'
+        )
+        return response
+    export_selected.short_description = 'Выгрузить выбранные в JSONL'
+    return export_selected
 
 
 @admin.register(Post)
@@ -17,6 +34,25 @@ class PostAdmin(admin.ModelAdmin):
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
+    actions = [export_action('posts')]
+
+
+@admin.register(Comment)
+class CommentAdmin(admin.ModelAdmin):
+    """Админка для модели Comment."""
+    list_display = ('pk', 'post', 'author', 'created')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post', 'author')
+    actions = [export_action('comments')]
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    """Админка для модели Follow."""
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    raw_id_fields = ('user', 'author')
+    actions = [export_action('follows')]
 
 
 admin.site.register(Group)
@@ -0,0 +1,131 @@
+from django.conf import settings
+from django.http import Http404, JsonResponse
+from django.views.decorators.http import condition, require_safe
+
+from core.routers import primary
+
+from . import caching, lookups, queries
+from .feed import feed_posts
+from .utils import (COUNT_OF_COMMENTS, COUNT_OF_POSTS, CURSOR_PARAM,
+                    CursorPaginator)
+
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'author__username', 'group__slug',
+)
+COMMENT_FIELDS = ('id', 'text', 'created', 'author__username')
+
+
+def _post(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'pub_date': row['pub_date'],
+        'author': row['author__username'],
+        'group': row['group__slug'],
+        'image': settings.MEDIA_URL + row['image'] if row['image'] else None,
+    }
+
+
+def _comment(row):
+    return {
+        'id': row['id'],
+        'text': row['text'],
+        'created': row['created'],
+        'author': row['author__username'],
+    }
+
+
+def _page(queryset, request, serialize, field='pub_date',
+          per_page=COUNT_OF_POSTS, keys=None):
+    """страница по курсору: строки values() без создания моделей"""
+    page = CursorPaginator(
+        queryset, per_page, field=field, keys=keys
+    ).get_page(request.GET.get(CURSOR_PARAM))
+    return {
+        'results': [serialize(row) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def conditional(*namespaces, feed=False):
+    """ETag и Last-Modified по версиям данных: если данные не менялись,
+    ответ 304 отдается до запросов к базе. Версии описывают основную
+    базу, поэтому и ответ с ними читается из нее, а не с реплики.
+    """
+    def names(request):
+        if feed:
+            return namespaces + (caching.feed_namespace(request.user.pk),)
+        return namespaces
+
+    def decorator(view):
+        return primary()(condition(
+            etag_func=lambda request, **kwargs: caching.etag(
+                request, *names(request)
+            ),
+            last_modified_func=lambda request, **kwargs: (
+                caching.last_modified(*names(request))
+            ),
+        )(view))
+    return decorator
+
+
+@require_safe
+@conditional(caching.POSTS)
+def index(request):
+    """последние посты"""
+    posts = queries.index_posts().values(*POST_FIELDS)
+    return JsonResponse(_page(posts, request, _post))
+
+
+@require_safe
+@conditional(caching.POSTS)
+def group_posts(request, slug):
+    """посты группы"""
+    group = lookups.get_group(slug)
+    posts = queries.group_posts(group).values(*POST_FIELDS)
+    return JsonResponse(_page(posts, request, _post))
+
+
+@require_safe
+@conditional(caching.POSTS)
+def profile(request, username):
+    """посты автора"""
+    author = lookups.get_user(username)
+    posts = queries.profile_posts(author).values(*POST_FIELDS)
+    return JsonResponse(_page(posts, request, _post))
+
+
+@require_safe
+@conditional(caching.POSTS, caching.COMMENTS)
+def post_detail(request, post_id):
+    """пост и страница комментариев к нему"""
+    post = queries.index_posts().filter(pk=post_id).values(
+        *POST_FIELDS
+    ).first()
+    if post is None:
+        raise Http404('Post not found')
+    comments = queries.post_comments(post_id).values(*COMMENT_FIELDS)
+    return JsonResponse({
+        'post': _post(post),
+        'comments': _page(
+            comments, request, _comment,
+            field='created', per_page=COUNT_OF_COMMENTS
+        ),
+    })
+
+
+def follow_index(request):
+    """лента подписок, только для вошедших пользователей"""
+    if not request.user.is_authenticated:
+        return JsonResponse({'detail': 'Нужно войти'}, status=401)
+    return _follow_index(request)
+
+
+@require_safe
+@conditional(caching.POSTS, feed=True)
+def _follow_index(request):
+    posts, keys = feed_posts(request.user)
+    return JsonResponse(_page(
+        posts.values(*POST_FIELDS), request, _post, keys=keys
+    ))
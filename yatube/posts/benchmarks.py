@@ -0,0 +1,177 @@
+import json
+import random
+import statistics
+import time
+import tracemalloc
+
+from django.core.cache import cache
+from django.db.models import Count
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from core.middleware import RequestProfile, profiling
+
+from . import caching, counters, search
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE: int = 500
+
+
+def seed(users=50, posts=500, comments=1000, follows=200, groups=5,
+         random_seed=0):
+    """Заполняет базу данными для замеров.
+    Массовые вставки не вызывают сигналов, поэтому производные
+    данные (счетчики, поисковый индекс) пересчитываются в конце.
+    """
+    rnd = random.Random(random_seed)
+    User.objects.bulk_create(
+        User(username=f'bench_{number}') for number in range(users)
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith='bench_'
+    ).values_list('pk', flat=True))
+    Group.objects.bulk_create(
+        Group(
+            title=f'Группа {number}',
+            slug=f'bench-group-{number}',
+            description='Группа для замеров',
+        )
+        for number in range(groups)
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith='bench-group-'
+    ).values_list('pk', flat=True))
+    Post.objects.bulk_create(
+        (Post(
+            author_id=rnd.choice(user_ids),
+            group_id=rnd.choice(group_ids + [None]),
+            text=f'Пост номер {number} для замеров',
+        ) for number in range(posts)),
+        batch_size=BATCH_SIZE
+    )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(
+            post_id=rnd.choice(post_ids),
+            author_id=rnd.choice(user_ids),
+            text=f'Комментарий {number}',
+        ) for number in range(comments)),
+        batch_size=BATCH_SIZE
+    )
+    pairs = {
+        tuple(rnd.sample(user_ids, 2))
+        for _ in range(follows)
+    }
+    for user_id, author_id in pairs:
+        Follow.objects.create(user_id=user_id, author_id=author_id)
+    counters.rebuild()
+    search.rebuild()
+    caching.bump_version(caching.POSTS)
+    caching.bump_version(caching.COMMENTS)
+    caching.bump_pages(user_ids, group_ids, post_ids)
+
+
+def scenarios():
+    """сценарии замеров: имя, метод, адрес и данные формы"""
+    follow = Follow.objects.select_related('user', 'author').first()
+    reader, author = follow.user, follow.author
+    post = Post.objects.filter(author=author).first() or Post.objects.first()
+    group = Group.objects.filter(posts__isnull=False).first()
+    hot_post = Post.objects.annotate(
+        total=Count('comments')
+    ).order_by('-total').first()
+    return reader, [
+        ('index', 'get', reverse('posts:index'), None),
+        ('group_posts', 'get',
+         reverse('posts:group_list', args=[group.slug]), None),
+        ('profile', 'get',
+         reverse('posts:profile', args=[author.username]), None),
+        ('post_detail', 'get',
+         reverse('posts:post_detail', args=[hot_post.pk]), None),
+        ('follow_index', 'get', reverse('posts:follow_index'), None),
+        ('search', 'get', reverse('posts:search') + '?q=замеров', None),
+        ('post_create', 'post', reverse('posts:post_create'),
+         {'text': 'Новый пост для замеров', 'group': group.pk}),
+        ('post_edit', 'post',
+         reverse('posts:post_edit', args=[post.pk]),
+         {'text': 'Исправленный пост для замеров'}),
+        ('add_comment', 'post',
+         reverse('posts:add_comment', args=[post.pk]),
+         {'text': 'Комментарий для замеров'}),
+        ('profile_follow', 'get',
+         reverse('posts:profile_follow', args=[author.username]), None),
+        ('profile_unfollow', 'get',
+         reverse('posts:profile_unfollow', args=[author.username]), None),
+    ]
+
+
+def percentile(values, percent):
+    """перцентиль по ближайшему рангу"""
+    ordered = sorted(values)
+    index = round(percent / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def measure(client, method, url, data, repeat):
+    """Замеряет один сценарий.
+    Кэш перед каждым запуском очищается, чтобы считались
+    запросы к базе самого view, а не попадания в кэш.
+    """
+    request = getattr(client, method)
+    timings = []
+    queries = 0
+    for _ in range(repeat):
+        cache.clear()
+        profile = RequestProfile()
+        with profiling(profile):
+            start = time.perf_counter()
+            request(url, data or {})
+            timings.append((time.perf_counter() - start) * 1000)
+        queries = max(queries, profile.query_count)
+    cache.clear()
+    tracemalloc.start()
+    request(url, data or {})
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'queries': queries,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'peak_alloc_kb': round(peak / 1024, 1),
+    }
+
+
+def run(repeat=20):
+    """Замеряет все сценарии, возвращает отчет.
+    Запросы считаются так же, как при профилировании, вместе
+    с выборками из пула VIEW_FETCH_WORKERS. Выборочное профилирование
+    middleware отключено, чтобы не перехватывать подсчет.
+    """
+    reader, cases = scenarios()
+    client = Client()
+    client.force_login(reader)
+    with override_settings(PROFILING_SAMPLE_RATE=0):
+        return {
+            name: measure(client, method, url, data, repeat)
+            for name, method, url, data in cases
+        }
+
+
+def compare(report, baseline):
+    """список сценариев, у которых выросло число запросов"""
+    return [
+        (name, baseline[name]['queries'], result['queries'])
+        for name, result in report.items()
+        if name in baseline
+        and result['queries'] > baseline[name]['queries']
+    ]
+
+
+def load_report(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_report(report, path):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2, sort_keys=True)
@@ -0,0 +1,186 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache
+
+from core.routers import primary
+
+POSTS: str = 'posts'
+COMMENTS: str = 'comments'
+
+PAGE_CACHE_TIMEOUT: int = 60 * 60 * 24
+# кэш в памяти процесса: другие воркеры не видят повышенных версий,
+# поэтому и версии, и страницы в нем живут недолго
+PROCESS_LOCAL_BACKENDS = ('django.core.cache.backends.locmem.LocMemCache',)
+LOCAL_TIMEOUT: int = 20
+LOCK_TIMEOUT: int = 10
+LOCK_WAIT: float = 2.0
+LOCK_POLL_INTERVAL: float = 0.05
+
+
+def _timeout(timeout=None):
+    """Срок жизни версий и страниц. В общем кэше -- timeout
+    (None -- бессрочно), в кэше процесса -- не дольше LOCAL_TIMEOUT.
+    """
+    backend = settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND']
+    if backend not in PROCESS_LOCAL_BACKENDS:
+        return timeout
+    return LOCAL_TIMEOUT if timeout is None else min(timeout, LOCAL_TIMEOUT)
+
+
+def _version_key(namespace):
+    return f'version:{namespace}'
+
+
+def _modified_key(namespace):
+    return f'modified:{namespace}'
+
+
+def feed_namespace(user_id):
+    """пространство имен ленты подписок пользователя"""
+    return f'feed:{user_id}'
+
+
+def author_namespace(user_id):
+    """пространство имен страницы автора: его посты и имя"""
+    return f'author:{user_id}'
+
+
+def group_namespace(group_id):
+    """пространство имен страницы группы: ее посты и описание"""
+    return f'group:{group_id}'
+
+
+def comments_namespace(post_id):
+    """пространство имен комментариев к посту"""
+    return f'comments:{post_id}'
+
+
+def _initial_version():
+    """начальная версия от текущего времени: после вытеснения ключа
+    версия не совпадет со старыми закэшированными страницами
+    """
+    return int(time.time() * 1000)
+
+
+def get_version(namespace):
+    """текущая версия данных пространства имен"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), _timeout())
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_version(namespace):
+    """делает недействительными все ключи пространства имен"""
+    key = _version_key(namespace)
+    cache.set(_modified_key(namespace), time.time(), _timeout())
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, _timeout())
+        return version
+
+
+def bump_pages(author_ids=(), group_ids=(), post_ids=()):
+    """Повышает версии страниц авторов, групп и комментариев к постам.
+    Для массовых вставок: bulk_create не вызывает сигналов моделей.
+    """
+    namespaces = (
+        [author_namespace(pk) for pk in set(author_ids)]
+        + [group_namespace(pk) for pk in set(group_ids) - {None}]
+        + [comments_namespace(pk) for pk in set(post_ids)]
+    )
+    for namespace in namespaces:
+        bump_version(namespace)
+
+
+def last_modified(*namespaces):
+    """Время последнего изменения данных пространств имен.
+    Если отметки нет (кэш очищен), изменением считается текущий момент.
+    """
+    now = time.time()
+    stamps = cache.get_many([_modified_key(ns) for ns in namespaces])
+    missing = {
+        _modified_key(ns): now for ns in namespaces
+        if _modified_key(ns) not in stamps
+    }
+    if missing:
+        cache.set_many(missing, _timeout())
+    return datetime.fromtimestamp(
+        int(max(list(stamps.values()) + list(missing.values()))),
+        tz=timezone.utc
+    )
+
+
+def etag(request, *namespaces):
+    """ETag ответа: версии данных, пользователь и полный путь"""
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    versions = '.'.join(str(get_version(ns)) for ns in namespaces)
+    raw = f'{versions}.{user}.{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_cache_key(request, key_prefix, namespace):
+    """ключ страницы: версия данных, пользователь и полный путь"""
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return f'{key_prefix}.{get_version(namespace)}.{user}.{path}'
+
+
+def _wait_for(key):
+    """ждет, пока страницу соберет другой процесс"""
+    deadline = time.monotonic() + LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        response = cache.get(key)
+        if response is not None:
+            return response
+    return None
+
+
+def cache_page_versioned(key_prefix, namespace=POSTS,
+                         timeout=PAGE_CACHE_TIMEOUT):
+    """Кэширует страницу до изменения данных пространства имен.
+    Ключ содержит версию, которую повышают сигналы моделей,
+    поэтому кэш живет долго и не отдает устаревших данных.
+    Страницу после промаха собирает только один процесс,
+    остальные ждут его результата. Собирается она по основной базе:
+    устаревшая реплика иначе попала бы в кэш под новой версией.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            key = page_cache_key(request, key_prefix, namespace)
+            response = cache.get(key)
+            if response is not None:
+                return response
+            lock = f'{key}.lock'
+            locked = cache.add(lock, 1, LOCK_TIMEOUT)
+            if not locked:
+                response = _wait_for(key)
+                if response is not None:
+                    return response
+            try:
+                with primary():
+                    response = view(request, *args, **kwargs)
+                if (
+                    response.status_code == 200
+                    and not response.streaming
+                    and not response.cookies
+                ):
+                    cache.set(key, response, _timeout(timeout))
+            finally:
+                if locked:
+                    cache.delete(lock)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,88 @@
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, User, UserStats
+
+BATCH_SIZE: int = 500
+
+SOURCES = {
+    'posts': (Post, 'author'),
+    'followers': (Follow, 'author'),
+    'following': (Follow, 'user'),
+    'comments': (Comment, 'author'),
+}
+
+
+def count(user_ids):
+    """считает счетчики пользователей по исходным таблицам"""
+    counts = {
+        user_id: dict.fromkeys(SOURCES, 0) for user_id in user_ids
+    }
+    for field, (model, lookup) in SOURCES.items():
+        rows = model.objects.filter(
+            **{f'{lookup}__in': user_ids}
+        ).values_list(lookup).annotate(total=Count('pk')).order_by()
+        for user_id, total in rows:
+            counts[user_id][field] = total
+    return counts
+
+
+def refresh(user_id):
+    """Пересчитывает счетчики одного пользователя.
+    Строка счетчиков блокируется до подсчета (в SQLite транзакция
+    и так начинается с BEGIN IMMEDIATE), поэтому change() из других
+    запросов ждет записи пересчета, а не теряется под ней.
+    """
+    with transaction.atomic():
+        list(UserStats.objects.select_for_update().filter(
+            user_id=user_id
+        ).values_list('pk', flat=True))
+        stats, _ = UserStats.objects.update_or_create(
+            user_id=user_id, defaults=count([user_id])[user_id]
+        )
+    return stats
+
+
+def rebuild():
+    """пересчитывает счетчики всех пользователей пачками"""
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        counts = count(batch)
+        UserStats.objects.filter(user_id__in=batch).delete()
+        UserStats.objects.bulk_create(
+            UserStats(user_id=user_id, **fields)
+            for user_id, fields in counts.items()
+        )
+    return len(user_ids)
+
+
+def change(user_id, field, delta):
+    """Атомарно меняет счетчик на delta.
+    Если строки счетчиков еще нет, при увеличении она создается
+    пересчетом, при уменьшении ничего не делается: строка
+    удаляемого пользователя не должна появиться заново.
+    """
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        refresh(user_id)
+
+
+def get_stats(user):
+    """счетчики пользователя одним запросом по первичному ключу"""
+    try:
+        return UserStats.objects.get(user_id=user.pk)
+    except UserStats.DoesNotExist:
+        return refresh(user.pk)
+
+
+def get_author_posts(post_id):
+    """число постов автора поста без загрузки самого поста,
+    None -- если счетчиков автора еще нет
+    """
+    return UserStats.objects.filter(
+        user__posts=post_id
+    ).values_list('posts', flat=True).first()
@@ -0,0 +1,86 @@
+import csv
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE: int = 2000
+
+# выгружаемые поля моделей
+EXPORTS = {
+    'posts': (Post, [
+        'id', 'author__username', 'group__slug', 'text', 'pub_date', 'image',
+    ]),
+    'comments': (Comment, [
+        'id', 'post_id', 'author__username', 'text', 'created',
+    ]),
+    'follows': (Follow, [
+        'id', 'user__username', 'author__username',
+    ]),
+}
+FORMATS = ('jsonl', 'csv')
+
+
+def rows(name, queryset=None):
+    """Строки модели словарями.
+    iterator(chunk_size) не кэширует результат в queryset,
+    поэтому память не растет с числом строк.
+    """
+    model, fields = EXPORTS[name]
+    if queryset is None:
+        queryset = model.objects.all()
+    return queryset.order_by('pk').values(*fields).iterator(
+        chunk_size=CHUNK_SIZE
+    )
+
+
+class _Echo:
+    """буфер для csv.writer: возвращает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def lines(name, file_format, queryset=None):
+    """строки файла выгрузки в кодировке utf-8"""
+    if file_format == 'csv':
+        writer = csv.writer(_Echo())
+        fields = EXPORTS[name][1]
+        yield writer.writerow(fields).encode()
+        for row in rows(name, queryset):
+            yield writer.writerow([row[field] for field in fields]).encode()
+        return
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows(name, queryset):
+        yield (encoder.encode(row) + '\n').encode()
+
+
+def gzipped(chunks):
+    """сжимает поток кусков в gzip, не собирая его в памяти"""
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(name, file_format='jsonl', compress=False, queryset=None):
+    """поток байтов выгрузки модели"""
+    chunks = lines(name, file_format, queryset)
+    return gzipped(chunks) if compress else chunks
+
+
+def filename(name, file_format, compress=False):
+    return f'{name}.{file_format}' + ('.gz' if compress else '')
+
+
+def export(name, path, file_format='jsonl', compress=False):
+    """пишет выгрузку модели в файл, возвращает число байтов"""
+    size = 0
+    with open(path, 'wb') as file:
+        for chunk in stream(name, file_format, compress):
+            file.write(chunk)
+            size += len(chunk)
+    return size
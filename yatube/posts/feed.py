@@ -0,0 +1,181 @@
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Q
+
+from core.executors import LazyExecutor
+
+from .counters import get_stats
+from .models import FeedItem, Follow, Post, UserStats
+
+BATCH_SIZE: int = 500
+# ключ курсора ленты: столбцы записи ленты из индекса
+# (user, -pub_date, -post), равные дате и первичному ключу поста
+FEED_KEYS = ('feed_date', 'feed_post')
+POST_KEYS = ('pub_date', 'pk')
+
+_backfills = LazyExecutor(lambda: ThreadPoolExecutor(
+    max_workers=settings.FEED_BACKFILL_WORKERS, thread_name_prefix='feed'
+))
+
+
+def is_celebrity(author):
+    """у автора слишком много подписчиков для раздачи постов по лентам"""
+    return get_stats(author).followers > settings.FEED_FANOUT_LIMIT
+
+
+def _bulk_insert(items):
+    """вставляет записи ленты пачками, дубли пропускает"""
+    FeedItem.objects.bulk_create(
+        items, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """раскладывает новый пост по лентам подписчиков автора"""
+    if is_celebrity(post.author):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedItem(
+            user_id=user_id,
+            author_id=post.author_id,
+            post_id=post.pk,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out_many(posts):
+    """раскладывает пачку новых постов, подписчики читаются
+    одним запросом на всех авторов пачки
+    """
+    author_ids = {post.author_id for post in posts}
+    celebrities = set(UserStats.objects.filter(
+        user_id__in=author_ids, followers__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('user_id', flat=True))
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=author_ids - celebrities
+    ).values_list('user_id', 'author_id').iterator():
+        followers.setdefault(author_id, []).append(user_id)
+    _bulk_insert(
+        FeedItem(
+            user_id=user_id,
+            author_id=post.author_id,
+            post_id=post.pk,
+            pub_date=post.pub_date,
+        )
+        for post in posts
+        for user_id in followers.get(post.author_id, ())
+    )
+
+
+def backfill(user, author):
+    """добавляет в ленту подписчика уже опубликованные посты автора"""
+    if is_celebrity(author):
+        return
+    posts = Post.objects.filter(author=author).values_list('pk', 'pub_date')
+    _bulk_insert(
+        FeedItem(
+            user_id=user.pk,
+            author_id=author.pk,
+            post_id=post_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def backfill_author(author_id):
+    """Раздает последние FEED_BACKFILL_POSTS постов автора по лентам
+    всех его подписчиков. Каждая пачка из BATCH_SIZE записей
+    вставляется своей транзакцией, блокировка записи не держится
+    на всю раздачу.
+    """
+    posts = list(
+        Post.objects.filter(author_id=author_id).order_by(
+            '-pub_date'
+        ).values_list('pk', 'pub_date')[:settings.FEED_BACKFILL_POSTS]
+    )
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    items = (
+        FeedItem(
+            user_id=user_id,
+            author_id=author_id,
+            post_id=post_id,
+            pub_date=pub_date,
+        )
+        for user_id in followers.iterator()
+        for post_id, pub_date in posts
+    )
+    for batch in iter(lambda: list(islice(items, BATCH_SIZE)), []):
+        _bulk_insert(batch)
+
+
+def _backfill_in_pool(author_id):
+    """backfill_author в фоновом потоке со своим соединением"""
+    try:
+        backfill_author(author_id)
+    finally:
+        close_old_connections()
+
+
+def _schedule_backfill(author_id):
+    if not settings.FEED_BACKFILL_WORKERS:
+        backfill_author(author_id)
+        return
+    _backfills.submit(_backfill_in_pool, author_id)
+
+
+def unfollowed(author_id):
+    """Отписка, после которой у автора ровно FEED_FANOUT_LIMIT
+    подписчиков, делает его обычным: посты такого автора больше
+    не подмешиваются при чтении, поэтому раскладываются по лентам
+    подписчиков, которые подписались, пока он был популярным.
+    Раскладка идет после коммита в фоновом потоке, а не в запросе
+    отписавшегося: если автор удаляется целиком, его постов
+    и подписок к этому моменту уже нет.
+    """
+    followers = UserStats.objects.filter(
+        user_id=author_id
+    ).values_list('followers', flat=True).first()
+    if followers == settings.FEED_FANOUT_LIMIT:
+        transaction.on_commit(lambda: _schedule_backfill(author_id))
+
+
+def prune(user, author):
+    """убирает из ленты посты автора, от которого отписались"""
+    FeedItem.objects.filter(user=user, author=author).delete()
+
+
+def feed_posts(user):
+    """Посты ленты подписок пользователя и поля ключа для курсора.
+    Посты обычных авторов читаются из ленты одним проходом по индексу
+    записей, посты популярных авторов (fan-out on read) добавляются
+    запросом по автору.
+    """
+    celebrities = list(
+        UserStats.objects.filter(
+            user__following__user=user,
+            followers__gt=settings.FEED_FANOUT_LIMIT
+        ).values_list('user_id', flat=True)
+    )
+    posts = Post.objects.select_related('group', 'author')
+    if not celebrities:
+        # аннотации после filter используют то же соединение с лентой
+        return posts.filter(feed_items__user=user).annotate(
+            feed_date=F('feed_items__pub_date'),
+            feed_post=F('feed_items__post_id'),
+        ).order_by('-feed_date', '-feed_post'), FEED_KEYS
+    return posts.filter(
+        Q(pk__in=FeedItem.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=celebrities)
+    ).order_by('-pub_date', '-pk'), POST_KEYS
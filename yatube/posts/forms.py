@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Comment, Post
 
 
@@ -13,6 +15,25 @@ class PostForm(forms.ModelForm):
             'group': 'Группа, к которой будет относиться пост',
         }
 
+    def clean_image(self):
+        """новая картинка уменьшается, пережимается и лишается метаданных"""
+        image = self.cleaned_data.get('image')
+        if not image:
+            if image is False:
+                self.instance.image_width = self.instance.image_height = None
+            return image
+        if not isinstance(image, UploadedFile):
+            return image
+        try:
+            processed, width, height = images.process(image)
+        except (OSError, ValueError):
+            raise forms.ValidationError(
+                'Не удалось обработать картинку', code='invalid_image'
+            )
+        self.instance.image_width = width
+        self.instance.image_height = height
+        return processed
+
 
 class CommentForm(forms.ModelForm):
     """"Класс для формы комментария"""
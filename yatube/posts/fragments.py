@@ -0,0 +1,54 @@
+from django.core.cache import cache
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+
+from . import caching, thumbnails
+from .models import Post
+
+CARD_TEMPLATE: str = 'includes/post_card.html'
+CARD_TIMEOUT: int = 60 * 60 * 24
+
+
+def card_key(post, show_author):
+    """ключ карточки: id и версия поста, вид карточки"""
+    variant = 'full' if show_author else 'short'
+    return f'post_card.{variant}.{post.pk}.{post.version}'
+
+
+def render_cards(posts, show_author=True):
+    """Собирает карточки постов страницы.
+    Готовые карточки берутся из кэша одним get_many,
+    заново отрисовываются только измененные посты; записи
+    о миниатюрах для них загружаются заранее, тоже разом.
+    """
+    posts = list(posts)
+    keys = [card_key(post, show_author) for post in posts]
+    cards = cache.get_many(keys)
+    thumbnails.prefetch(
+        post for post, key in zip(posts, keys) if key not in cards
+    )
+    missing = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            missing[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post, 'show_author': show_author}
+            )
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [mark_safe(cards[key]) for key in keys]
+
+
+def bump_versions(**lookup):
+    """Повышает версии постов, чьи карточки устарели, и версии
+    страниц их авторов и групп.
+    """
+    posts = Post.objects.filter(**lookup)
+    pages = set(posts.values_list('author_id', 'group_id').order_by())
+    posts.update(version=F('version') + 1, updated=timezone.now())
+    for author_id, group_id in pages:
+        caching.bump_version(caching.author_namespace(author_id))
+        if group_id is not None:
+            caching.bump_version(caching.group_namespace(group_id))
@@ -0,0 +1,99 @@
+import hashlib
+
+from django.views.decorators.http import condition
+
+from core.routers import primary
+
+from . import caching, lookups
+from .counters import get_stats
+from .models import Post
+
+
+def _viewer(request):
+    return request.user.pk if request.user.is_authenticated else 'anon'
+
+
+def _versions(namespaces):
+    return tuple(caching.get_version(namespace) for namespace in namespaces)
+
+
+def post_state(request, post_id):
+    """Версия карточки поста (ее повышают правки, смена группы
+    и имени автора, готовая миниатюра), версия комментариев
+    и число постов автора из боковой колонки -- один запрос
+    по первичному ключу.
+    """
+    row = Post.objects.filter(pk=post_id).values_list(
+        'version', 'updated', 'author__stats__posts'
+    ).first()
+    if row is None:
+        return None
+    version, updated, posts = row
+    comments = caching.comments_namespace(post_id)
+    return {
+        'modified': max(updated, caching.last_modified(comments)),
+        'versions': (version, caching.get_version(comments)),
+        'posts': posts,
+    }
+
+
+def profile_state(request, username):
+    """версии страницы автора и подписок зрителя, число постов автора"""
+    author = lookups.get_user(username)
+    namespaces = [caching.author_namespace(author.pk)]
+    if request.user.is_authenticated:
+        namespaces.append(caching.feed_namespace(request.user.pk))
+    return {
+        'modified': caching.last_modified(*namespaces),
+        'versions': _versions(namespaces),
+        'posts': get_stats(author).posts,
+    }
+
+
+def group_state(request, slug):
+    """версия страницы группы"""
+    namespace = caching.group_namespace(lookups.get_group(slug).pk)
+    return {
+        'modified': caching.last_modified(namespace),
+        'versions': _versions([namespace]),
+    }
+
+
+def known_posts(request):
+    """число постов автора, уже прочитанное для условного GET"""
+    state = getattr(request, '_page_state', None)
+    return state.get('posts') if state else None
+
+
+def conditional_page(state_func):
+    """Условный GET для страницы.
+    Состояние страницы -- версии пространств имен из кэша, которые
+    повышают сигналы моделей, и счетчики автора; оно считается до
+    основных запросов view без обхода постов. При заголовке
+    If-None-Match Django сравнивает только ETag. Состояние и страница
+    с ним читаются из основной базы, а не с отстающей реплики.
+    """
+    def state(request, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = state_func(request, **kwargs)
+        return request._page_state
+
+    def etag(request, **kwargs):
+        current = state(request, **kwargs)
+        if current is None:
+            return None
+        raw = (
+            f'{_viewer(request)}.{request.get_full_path()}'
+            f'.{current["versions"]}.{current.get("posts")}'
+        )
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        current = state(request, **kwargs)
+        return current['modified'] if current else None
+
+    def decorator(view):
+        return primary()(condition(
+            etag_func=etag, last_modified_func=last_modified
+        )(view))
+    return decorator
@@ -0,0 +1,71 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from core.executors import LazyExecutor
+
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png'}
+
+_executor = LazyExecutor(lambda: ProcessPoolExecutor(
+    max_workers=settings.IMAGE_PROCESS_WORKERS
+))
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def encode(data, max_size, quality):
+    """Уменьшает картинку до max_size по большей стороне и пережимает:
+    непрозрачные -- в прогрессивный JPEG, с прозрачностью -- в PNG.
+    EXIF (с координатами съемки) и прочие метаданные не копируются,
+    поворот из EXIF применяется к пикселям. Анимация не трогается.
+    Возвращает байты (None -- оставить исходные), формат и размеры.
+    Выполняется и в отдельном процессе, поэтому работает только с байтами.
+    """
+    with Image.open(BytesIO(data)) as source:
+        if getattr(source, 'is_animated', False):
+            return None, source.format, source.size
+        icc_profile = source.info.get('icc_profile')
+        image = ImageOps.exif_transpose(source)
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    if _has_alpha(image):
+        image, image_format = image.convert('RGBA'), 'PNG'
+        options = {'optimize': True}
+    else:
+        image, image_format = image.convert('RGB'), 'JPEG'
+        options = {'quality': quality, 'optimize': True, 'progressive': True}
+    # PNG берет EXIF из info, если его не передать явно
+    image.info = {}
+    if icc_profile:
+        options['icc_profile'] = icc_profile
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue(), image_format, image.size
+
+
+def process(uploaded):
+    """Обрабатывает загруженную картинку.
+    Возвращает файл для сохранения в ImageField и его размеры.
+    При IMAGE_PROCESS_WORKERS > 0 пережатие идет в пуле процессов
+    и не держит GIL потока, обслуживающего запросы.
+    """
+    uploaded.seek(0)
+    data = uploaded.read()
+    args = (data, settings.IMAGE_MAX_SIZE, settings.IMAGE_QUALITY)
+    if settings.IMAGE_PROCESS_WORKERS:
+        result = _executor.submit(encode, *args).result()
+    else:
+        result = encode(*args)
+    encoded, image_format, (width, height) = result
+    name = os.path.basename(uploaded.name)
+    if encoded is None:
+        return ContentFile(data, name=name), width, height
+    name = os.path.splitext(name)[0] + EXTENSIONS[image_format]
+    return ContentFile(encoded, name=name), width, height
@@ -0,0 +1,249 @@
+import csv
+import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, feed, images, search, thumbnails
+from .models import Group, Post, User
+
+BATCH_SIZE: int = 500
+IMAGE_WORKERS: int = 4
+IMAGE_DIR: str = 'posts/'
+
+
+def read_records(path, file_format=None):
+    """Построчно читает записи из JSONL или CSV.
+    Формат без явного указания определяется по расширению файла.
+    """
+    if file_format is None:
+        file_format = 'csv' if path.endswith('.csv') else 'jsonl'
+    with open(path, encoding='utf-8', newline='') as file:
+        if file_format == 'csv':
+            yield from csv.DictReader(file)
+        else:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def parse_date(value):
+    """дата публикации из записи, без пояса -- в поясе проекта"""
+    date = parse_datetime(value or '')
+    if date is not None and timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+def batches(records, size):
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def load_checkpoint(path):
+    """сколько записей уже импортировано"""
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)['done']
+    except FileNotFoundError:
+        return 0
+
+
+def save_checkpoint(path, done):
+    """пишет отметку атомарно: оборванная запись не портит старую"""
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w', encoding='utf-8') as file:
+        json.dump({'done': done}, file)
+    os.replace(temporary, path)
+
+
+def copy_image(source):
+    """Обрабатывает картинку, как при загрузке через форму, и кладет
+    в хранилище. Возвращает ее имя и размеры.
+    """
+    with open(source, 'rb') as file:
+        processed, width, height = images.process(File(file))
+    name = default_storage.save(IMAGE_DIR + processed.name, processed)
+    return name, width, height
+
+
+def remove_images(copies):
+    """удаляет копии картинок, не попавшие в базу"""
+    for copy in copies:
+        if copy:
+            default_storage.delete(copy[0])
+
+
+class Importer:
+    """Импорт постов пачками.
+    Авторы и группы пачки ищутся одним запросом, посты вставляются
+    bulk_create в одной транзакции на пачку. Массовая вставка не
+    вызывает сигналов, поэтому ленты, счетчики и поисковый индекс
+    обновляются здесь же, тоже пачкой.
+    """
+
+    def __init__(self, create_authors=False, image_root='',
+                 image_workers=IMAGE_WORKERS):
+        self.create_authors = create_authors
+        self.image_root = image_root
+        self.image_workers = image_workers
+        self.stats = Counter()
+
+    def resolve_authors(self, records):
+        usernames = {record.get('author') for record in records} - {None, ''}
+        authors = dict(User.objects.filter(
+            username__in=usernames
+        ).values_list('username', 'pk'))
+        missing = usernames - authors.keys()
+        if missing and self.create_authors:
+            # по отметке времени видно, какие строки вставлены нами,
+            # а какие пропущены ignore_conflicts как уже созданные
+            joined = timezone.now()
+            User.objects.bulk_create(
+                (User(username=username, date_joined=joined)
+                 for username in missing),
+                ignore_conflicts=True
+            )
+            created = User.objects.filter(username__in=missing)
+            authors.update(created.values_list('username', 'pk'))
+            self.stats['authors'] += created.filter(
+                date_joined=joined
+            ).count()
+        return authors
+
+    @staticmethod
+    def resolve_groups(records):
+        slugs = {record.get('group') for record in records} - {None, ''}
+        return dict(Group.objects.filter(
+            slug__in=slugs
+        ).values_list('slug', 'pk'))
+
+    def copy_images(self, records, executor):
+        """Копии картинок записей с текстом: имя и размеры или None.
+        Копируются до транзакции, чтобы не держать блокировку базы.
+        """
+        sources = [
+            os.path.join(self.image_root, record['image'])
+            if record.get('text') and record.get('image') else None
+            for record in records
+        ]
+        futures = [
+            executor.submit(copy_image, source) if source else None
+            for source in sources
+        ]
+        copies = []
+        for future in futures:
+            if future is None:
+                copies.append(None)
+                continue
+            try:
+                copies.append(future.result())
+            except (OSError, ValueError):
+                self.stats['image_errors'] += 1
+                copies.append(None)
+        return copies
+
+    def build_posts(self, records, copies):
+        """посты из записей, копии картинок пропущенных записей удаляются"""
+        authors = self.resolve_authors(records)
+        groups = self.resolve_groups(records)
+        valid, skipped = [], []
+        for record, copy in zip(records, copies):
+            if record.get('text') and record.get('author') in authors:
+                valid.append((record, copy))
+            else:
+                skipped.append(copy)
+        self.stats['skipped'] += len(skipped)
+        remove_images(skipped)
+        posts = [
+            Post(
+                text=record['text'],
+                author_id=authors[record['author']],
+                group_id=groups.get(record.get('group')),
+                image=copy[0] if copy else '',
+                image_width=copy[1] if copy else None,
+                image_height=copy[2] if copy else None,
+            )
+            for record, copy in valid
+        ]
+        dates = [parse_date(record.get('pub_date')) for record, _ in valid]
+        return posts, dates
+
+    @staticmethod
+    def insert(posts, dates):
+        """Вставляет посты и восстанавливает их даты.
+        SQLite не возвращает ключи из bulk_create: внутри транзакции
+        новые ключи идут подряд после последнего.
+        """
+        last_pk = Post.objects.order_by('-pk').values_list(
+            'pk', flat=True
+        ).first() or 0
+        Post.objects.bulk_create(posts, batch_size=BATCH_SIZE)
+        if posts[0].pk is None:
+            pks = Post.objects.filter(pk__gt=last_pk).order_by(
+                'pk'
+            ).values_list('pk', flat=True)
+            for post, pk in zip(posts, pks):
+                post.pk = pk
+        # auto_now_add затирает даты при вставке
+        dated = []
+        for post, date in zip(posts, dates):
+            if date is not None:
+                post.pub_date = date
+                dated.append(post)
+        Post.objects.bulk_update(dated, ['pub_date'], batch_size=BATCH_SIZE)
+
+    @staticmethod
+    def update_derived(posts):
+        """ленты, счетчики и поисковый индекс новых постов"""
+        for author_id, total in Counter(
+            post.author_id for post in posts
+        ).items():
+            counters.change(author_id, 'posts', total)
+        feed.fan_out_many(posts)
+        search.index_posts(posts)
+
+    def run(self, records, batch_size=BATCH_SIZE, skip=0, checkpoint=None):
+        """импортирует записи, после каждой пачки пишет отметку"""
+        done = skip
+        with ThreadPoolExecutor(self.image_workers) as executor:
+            for batch in batches(islice(records, skip, None), batch_size):
+                copies = self.copy_images(batch, executor)
+                try:
+                    with transaction.atomic():
+                        posts, dates = self.build_posts(batch, copies)
+                        if posts:
+                            self.insert(posts, dates)
+                            self.update_derived(posts)
+                except Exception:
+                    remove_images(copies)
+                    raise
+                for post in posts:
+                    if post.image:
+                        thumbnails.queue(
+                            post.image.name, thumbnails.post_geometries()
+                        )
+                # после фиксации: иначе страницу со старыми данными
+                # успели бы закэшировать под новой версией
+                if posts:
+                    caching.bump_version(caching.POSTS)
+                    caching.bump_pages(
+                        (post.author_id for post in posts),
+                        (post.group_id for post in posts),
+                    )
+                done += len(batch)
+                self.stats['posts'] += len(posts)
+                if checkpoint:
+                    save_checkpoint(checkpoint, done)
+                yield done
@@ -0,0 +1,73 @@
+import threading
+
+from django.core.signals import request_finished
+from sorl.thumbnail.conf import settings
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+EMPTY_VALUE = cached_db_kvstore.EMPTY_VALUE
+
+_local = threading.local()
+
+
+def _memo():
+    if not hasattr(_local, 'values'):
+        _local.values = {}
+    return _local.values
+
+
+def forget(**kwargs):
+    """значения, загруженные за запрос, после него не нужны"""
+    _local.values = {}
+
+
+request_finished.connect(forget, dispatch_uid='posts_kvstore_forget')
+
+
+class KVStore(cached_db_kvstore.KVStore):
+    """Хранилище ключей sorl-thumbnail с пакетной загрузкой.
+    prefetch загружает записи для всех миниатюр страницы: одним
+    get_many из общего кэша, а пропущенные в нем -- одним запросом
+    к базе. Дальше до конца запроса _get_raw берет их из памяти
+    потока, не обращаясь ни к кэшу, ни к базе.
+    """
+
+    def prefetch(self, image_files):
+        memo = _memo()
+        keys = [
+            add_prefix(image_file.key) for image_file in image_files
+        ]
+        keys = [key for key in dict.fromkeys(keys) if key not in memo]
+        if not keys:
+            return
+        found = self.cache.get_many(keys)
+        missing = [key for key in keys if key not in found]
+        if missing:
+            loaded = dict(KVStoreModel.objects.filter(
+                key__in=missing
+            ).values_list('key', 'value'))
+            # отсутствие тоже кэшируется, как в _get_raw
+            loaded.update({
+                key: EMPTY_VALUE for key in missing if key not in loaded
+            })
+            self.cache.set_many(loaded, settings.THUMBNAIL_CACHE_TIMEOUT)
+            found.update(loaded)
+        memo.update(found)
+
+    def _get_raw(self, key):
+        memo = _memo()
+        if key in memo:
+            value = memo[key]
+            return None if value == EMPTY_VALUE else value
+        return super()._get_raw(key)
+
+    def _set_raw(self, key, value):
+        super()._set_raw(key, value)
+        _memo().pop(key, None)
+
+    def _delete_raw(self, *keys):
+        super()._delete_raw(*keys)
+        memo = _memo()
+        for key in keys:
+            memo.pop(key, None)
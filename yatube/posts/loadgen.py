@@ -0,0 +1,503 @@
+import asyncio
+import os
+import random
+import shutil
+import socket
+import statistics
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from . import caching, counters
+from .benchmarks import percentile
+from .importer import BATCH_SIZE, Importer
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+USER_PREFIX = 'load_'
+GROUP_PREFIX = 'load-'
+PASSWORD = 'load-test-password'
+IMAGE_POOL: int = 12
+IMAGE_SIZE = (1600, 1200)
+# за сколько дней разбросаны даты постов
+POSTS_PERIOD_DAYS: int = 90
+
+# доли сценариев нагрузки: чтение преобладает над записью
+MIX = {
+    'index': 30,
+    'group_posts': 15,
+    'profile': 15,
+    'post_detail': 20,
+    'follow_index': 10,
+    'add_comment': 5,
+    'post_create': 3,
+    'profile_follow': 2,
+}
+
+
+def zipf_weights(count, exponent):
+    """веса по закону Ципфа: k-й по популярности в k**s раз реже первого"""
+    return [1 / rank ** exponent for rank in range(1, count + 1)]
+
+
+def make_images(directory, count=IMAGE_POOL, size=IMAGE_SIZE, rnd=random):
+    """Картинки размером с настоящие снимки: градиенты с шумом,
+    который плохо сжимается. Возвращает имена файлов.
+    """
+    gradients = [
+        Image.linear_gradient('L').resize(size),
+        Image.radial_gradient('L').resize(size),
+    ]
+    names = []
+    for number in range(count):
+        channels = [
+            Image.blend(
+                rnd.choice(gradients),
+                Image.effect_noise(size, rnd.randint(20, 60)),
+                0.3,
+            )
+            for _ in range(3)
+        ]
+        name = f'load_{number}.jpg'
+        Image.merge('RGB', channels).save(
+            os.path.join(directory, name), 'JPEG', quality=90
+        )
+        names.append(name)
+    return names
+
+
+def _ids(model, field, prefix):
+    return list(model.objects.filter(
+        **{f'{field}__startswith': prefix}
+    ).order_by('pk').values_list('pk', field))
+
+
+def seed(users=1000, groups=20, posts=10000, comments=20000,
+         follows_per_user=20, exponent=1.1, image_share=0.05,
+         password=PASSWORD, random_seed=0, progress=None):
+    """Заполняет базу правдоподобными данными с перекосом.
+    Популярность пользователей распределена по закону Ципфа:
+    от нее зависят и число подписчиков, и число постов, поэтому
+    у немногих авторов тысячи подписчиков, а у большинства -- единицы.
+    Так же неравномерно распределены посты по группам и комментарии
+    по постам: свежие и популярные обсуждают чаще.
+    """
+    rnd = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    progress = progress or (lambda message: None)
+
+    password_hash = make_password(password)
+    start = User.objects.filter(username__startswith=USER_PREFIX).count()
+    User.objects.bulk_create(
+        (User(
+            username=f'{USER_PREFIX}{number}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=password_hash,
+        ) for number in range(start, start + users)),
+        batch_size=BATCH_SIZE
+    )
+    people = _ids(User, 'username', USER_PREFIX)
+    # место в рейтинге популярности не совпадает с порядком создания
+    rnd.shuffle(people)
+    popularity = zipf_weights(len(people), exponent)
+    progress(f'Пользователей: {len(people)}')
+
+    start = Group.objects.filter(slug__startswith=GROUP_PREFIX).count()
+    Group.objects.bulk_create(
+        Group(
+            title=f'{fake.word().capitalize()} {number}',
+            slug=f'{GROUP_PREFIX}{number}',
+            description=fake.sentence(),
+        )
+        for number in range(start, start + groups)
+    )
+    communities = _ids(Group, 'slug', GROUP_PREFIX)
+    hotness = zipf_weights(len(communities), exponent)
+
+    follows = set()
+    for user_id, _ in people:
+        wanted = min(
+            len(people) - 1, int(rnd.expovariate(1 / follows_per_user))
+        )
+        for author_id, _ in rnd.choices(people, popularity, k=wanted):
+            if author_id != user_id:
+                follows.add((user_id, author_id))
+    # до постов: по подпискам импорт раздаст посты по лентам
+    Follow.objects.bulk_create(
+        (Follow(user_id=user_id, author_id=author_id)
+         for user_id, author_id in follows),
+        batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+    # bulk_create не шлет сигналов: подписчиков пересчитываем до импорта,
+    # иначе он разложит по лентам посты популярных авторов
+    counters.rebuild()
+    progress(f'Подписок: {len(follows)}')
+
+    image_root = tempfile.mkdtemp()
+    try:
+        images = make_images(image_root, rnd=rnd) if image_share else []
+        now = timezone.now()
+
+        def records():
+            for _ in range(posts):
+                _, username = rnd.choices(people, popularity)[0]
+                group = (
+                    rnd.choices(communities, hotness)[0][1]
+                    if communities and rnd.random() < 0.7 else None
+                )
+                age = min(
+                    rnd.expovariate(3 / POSTS_PERIOD_DAYS),
+                    POSTS_PERIOD_DAYS
+                )
+                yield {
+                    'author': username,
+                    'group': group,
+                    'text': fake.paragraph(nb_sentences=rnd.randint(1, 6)),
+                    'pub_date': (now - timedelta(days=age)).isoformat(),
+                    'image': (
+                        rnd.choice(images)
+                        if images and rnd.random() < image_share else ''
+                    ),
+                }
+
+        importer = Importer(image_root=image_root)
+        for done in importer.run(records()):
+            progress(f'Постов: {done}')
+    finally:
+        shutil.rmtree(image_root, ignore_errors=True)
+
+    post_ids = list(Post.objects.filter(
+        author__username__startswith=USER_PREFIX
+    ).order_by('-pub_date').values_list('pk', flat=True))
+    discussed_ids = set()
+    if post_ids:
+        discussed = zipf_weights(len(post_ids), exponent)
+        commented = rnd.choices(post_ids, discussed, k=comments)
+        discussed_ids.update(commented)
+        Comment.objects.bulk_create(
+            (Comment(
+                post_id=post_id,
+                author_id=rnd.choice(people)[0],
+                text=fake.sentence(),
+            ) for post_id in commented),
+            batch_size=BATCH_SIZE
+        )
+    progress(f'Комментариев: {comments if post_ids else 0}')
+
+    counters.rebuild()
+    caching.bump_version(caching.POSTS)
+    caching.bump_version(caching.COMMENTS)
+    # страницы авторов и групп повысил импорт, комментарии -- здесь
+    caching.bump_pages(post_ids=discussed_ids)
+    return {
+        'users': len(people),
+        'groups': len(communities),
+        'follows': len(follows),
+        'posts': len(post_ids),
+        'comments': comments if post_ids else 0,
+    }
+
+
+class Targets:
+    """Адреса для нагрузки, выбранные с тем же перекосом, что и данные:
+    популярные авторы, группы и свежие посты запрашиваются чаще.
+    """
+
+    def __init__(self, limit=1000, rnd=random):
+        self.rnd = rnd
+        authors = list(UserStats.objects.filter(
+            user__username__startswith=USER_PREFIX
+        ).order_by('-followers').values_list(
+            'user__username', 'followers'
+        )[:limit])
+        self.authors = [username for username, _ in authors]
+        self.author_weights = [followers + 1 for _, followers in authors]
+        self.readers = list(User.objects.filter(
+            username__startswith=USER_PREFIX
+        ).values_list('username', flat=True)[:limit])
+        self.groups = list(Group.objects.filter(
+            slug__startswith=GROUP_PREFIX
+        ).values_list('slug', flat=True))
+        self.posts = list(Post.objects.order_by(
+            '-pub_date'
+        ).values_list('pk', flat=True)[:limit])
+        self.post_weights = zipf_weights(len(self.posts), 1.0)
+        self.group_pks = dict(Group.objects.filter(
+            slug__in=self.groups
+        ).values_list('slug', 'pk'))
+
+    def author(self):
+        return self.rnd.choices(self.authors, self.author_weights)[0]
+
+    def post(self):
+        return self.rnd.choices(self.posts, self.post_weights)[0]
+
+    def request(self, name):
+        """метод, адрес и данные формы сценария"""
+        if name == 'index':
+            return 'get', reverse('posts:index'), None
+        if name == 'group_posts':
+            slug = self.rnd.choice(self.groups)
+            return 'get', reverse('posts:group_list', args=[slug]), None
+        if name == 'profile':
+            return 'get', reverse('posts:profile', args=[self.author()]), None
+        if name == 'post_detail':
+            return 'get', reverse(
+                'posts:post_detail', args=[self.post()]
+            ), None
+        if name == 'follow_index':
+            return 'get', reverse('posts:follow_index'), None
+        if name == 'add_comment':
+            return 'post', reverse(
+                'posts:add_comment', args=[self.post()]
+            ), {'text': 'Комментарий под нагрузкой'}
+        if name == 'post_create':
+            data = {'text': 'Пост под нагрузкой'}
+            if self.groups:
+                data['group'] = self.group_pks[self.rnd.choice(self.groups)]
+            return 'post', reverse('posts:post_create'), data
+        if name == 'profile_follow':
+            return 'get', reverse(
+                'posts:profile_follow', args=[self.author()]
+            ), None
+        raise ValueError(f'Неизвестный сценарий: {name}')
+
+
+def parse_mix(value):
+    """'index=30,post_detail=20' -> словарь долей сценариев"""
+    mix = {}
+    for item in filter(None, value.split(',')):
+        name, _, weight = item.partition('=')
+        if name not in MIX:
+            raise ValueError(f'Неизвестный сценарий: {name}')
+        mix[name] = int(weight)
+    return mix
+
+
+class LoadDriver:
+    """Нагрузка на запущенный сайт смесью сценариев MIX.
+    Каждый поток входит под своим пользователем из seed_load
+    и шлет запросы, пока не выйдет время или не кончится лимит.
+    """
+
+    def __init__(self, base_url, targets, mix=None, concurrency=8,
+                 duration=30.0, total=None, password=PASSWORD,
+                 timeout=30.0, random_seed=0):
+        self.base_url = base_url.rstrip('/')
+        self.targets = targets
+        self.mix = mix or MIX
+        self.concurrency = concurrency
+        self.duration = duration
+        self.total = total
+        self.password = password
+        self.timeout = timeout
+        self.rnd = random.Random(random_seed)
+        self.lock = threading.Lock()
+        self.sent = 0
+        self.timings = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def login(self, session, username):
+        url = self.base_url + reverse('users:login')
+        session.get(url, timeout=self.timeout)
+        response = session.post(url, data={
+            'username': username,
+            'password': self.password,
+            'csrfmiddlewaretoken': session.cookies.get('csrftoken'),
+        }, timeout=self.timeout)
+        if response.url.startswith(url):
+            raise RuntimeError(f'Не удалось войти как {username}')
+
+    def take(self, deadline):
+        """можно ли отправить еще один запрос"""
+        with self.lock:
+            if time.monotonic() >= deadline:
+                return False
+            if self.total is not None and self.sent >= self.total:
+                return False
+            self.sent += 1
+            return True
+
+    def send(self, session, name):
+        with self.lock:
+            method, path, data = self.targets.request(name)
+        if method == 'post':
+            data = {
+                **data, 'csrfmiddlewaretoken': session.cookies.get('csrftoken')
+            }
+        start = time.perf_counter()
+        try:
+            response = session.request(
+                method, self.base_url + path, data=data, timeout=self.timeout
+            )
+            failed = response.status_code >= 400
+        except requests.RequestException:
+            failed = True
+        elapsed = (time.perf_counter() - start) * 1000
+        with self.lock:
+            self.timings[name].append(elapsed)
+            if failed:
+                self.errors[name] += 1
+
+    def worker(self, username, deadline, seed):
+        rnd = random.Random(seed)
+        names, weights = zip(*self.mix.items())
+        with requests.Session() as session:
+            self.login(session, username)
+            while self.take(deadline):
+                self.send(session, rnd.choices(names, weights)[0])
+
+    def run(self):
+        """запускает потоки, возвращает отчет"""
+        readers = self.rnd.sample(
+            self.targets.readers,
+            min(self.concurrency, len(self.targets.readers))
+        )
+        deadline = time.monotonic() + self.duration
+        started = time.perf_counter()
+        threads = [
+            threading.Thread(
+                target=self.worker,
+                args=(username, deadline, self.rnd.random())
+            )
+            for username in readers
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed):
+        scenarios = {
+            name: {
+                'requests': len(timings),
+                'errors': self.errors[name],
+                'p50_ms': round(statistics.median(timings), 3),
+                'p95_ms': round(percentile(timings, 95), 3),
+                'p99_ms': round(percentile(timings, 99), 3),
+            }
+            for name, timings in sorted(self.timings.items())
+        }
+        everything = [
+            value for timings in self.timings.values() for value in timings
+        ]
+        return {
+            'requests': len(everything),
+            'errors': sum(self.errors.values()),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(everything) / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(statistics.median(everything), 3)
+            if everything else None,
+            'p95_ms': round(percentile(everything, 95), 3)
+            if everything else None,
+            'p99_ms': round(percentile(everything, 99), 3)
+            if everything else None,
+            'scenarios': scenarios,
+        }
+
+
+async def slow_request(host, port, path, send_delay, read_delay,
+                       pieces=4, read_size=4096):
+    """GET от медленного клиента: запрос уходит pieces частями
+    с паузой send_delay, ответ читается по read_size байт
+    с паузой read_delay. Буфер приема сокета маленький, поэтому
+    сервер не может сразу сбросить в него весь ответ.
+    Возвращает код ответа.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, read_size)
+    sock.setblocking(False)
+    try:
+        await asyncio.get_running_loop().sock_connect(sock, (host, port))
+    except OSError:
+        sock.close()
+        raise
+    reader, writer = await asyncio.open_connection(
+        sock=sock, limit=read_size
+    )
+    try:
+        request = (
+            f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+            f'User-Agent: yatube-slow-client\r\nConnection: close\r\n\r\n'
+        ).encode('latin-1')
+        step = -(-len(request) // pieces)
+        for start in range(0, len(request), step):
+            if start:
+                await asyncio.sleep(send_delay)
+            writer.write(request[start:start + step])
+            await writer.drain()
+        status = int((await reader.readline()).split()[1])
+        while await reader.read(read_size):
+            await asyncio.sleep(read_delay)
+        return status
+    finally:
+        writer.close()
+
+
+class SlowClients:
+    """Много одновременных медленных клиентов на одном цикле событий:
+    так ведут себя мобильные сети. Каждый клиент по очереди отправляет
+    requests_per_client запросов на адреса из paths.
+    """
+
+    def __init__(self, base_url, paths, clients=64, requests_per_client=4,
+                 send_delay=0.05, read_delay=0.01, timeout=60.0):
+        address = urlsplit(base_url)
+        self.host, self.port = address.hostname, address.port or 80
+        self.paths = paths
+        self.clients = clients
+        self.requests_per_client = requests_per_client
+        self.send_delay = send_delay
+        self.read_delay = read_delay
+        self.timeout = timeout
+
+    async def client(self, number):
+        results = []
+        for index in range(self.requests_per_client):
+            path = self.paths[(number + index) % len(self.paths)]
+            start = time.perf_counter()
+            try:
+                status = await asyncio.wait_for(slow_request(
+                    self.host, self.port, path,
+                    self.send_delay, self.read_delay
+                ), self.timeout)
+            except (OSError, ValueError, IndexError, asyncio.TimeoutError):
+                status = None
+            results.append((status, (time.perf_counter() - start) * 1000))
+        return results
+
+    async def drive(self):
+        started = time.perf_counter()
+        results = await asyncio.gather(
+            *(self.client(number) for number in range(self.clients))
+        )
+        return time.perf_counter() - started, [
+            result for client in results for result in client
+        ]
+
+    def run(self):
+        """запускает клиентов, возвращает отчет"""
+        elapsed, results = asyncio.run(self.drive())
+        timings = [timing for status, timing in results if status == 200]
+        return {
+            'requests': len(results),
+            'errors': len(results) - len(timings),
+            'seconds': round(elapsed, 3),
+            'rps': round(len(timings) / elapsed, 2) if elapsed else 0,
+            'p50_ms': round(statistics.median(timings), 3)
+            if timings else None,
+            'p95_ms': round(percentile(timings, 95), 3) if timings else None,
+            'p99_ms': round(percentile(timings, 99), 3) if timings else None,
+        }
@@ -0,0 +1,118 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+
+from .models import Group, User
+
+LOCAL_SIZE: int = 1024
+LOCAL_TTL: float = 5.0
+SHARED_TIMEOUT: int = 60 * 60
+
+# поле, по которому ищется объект модели
+FIELDS = {
+    Group: 'slug',
+    User: 'username',
+}
+
+
+class LRUCache:
+    """Ограниченный кэш в памяти процесса.
+    Самые давно запрошенные ключи вытесняются первыми,
+    записи живут не дольше ttl секунд: так изменения,
+    сделанные другими процессами, видны через ttl.
+    """
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(LOCAL_SIZE, LOCAL_TTL)
+
+
+def _key(model, value):
+    digest = hashlib.md5(str(value).encode()).hexdigest()
+    return f'lookup:row:{model._meta.label_lower}:{digest}'
+
+
+def _fields(model):
+    """Поля, значения которых хранятся в кэше.
+    Хэш пароля в общий кэш не попадает.
+    """
+    return [
+        field.attname for field in model._meta.concrete_fields
+        if not (model is User and field.attname == 'password')
+    ]
+
+
+def get_cached(model, value):
+    """Объект модели по slug или username.
+    Строка ищется в памяти процесса, затем в общем кэше, затем в базе.
+    В кэшах лежат кортежи значений, и каждый вызов получает новый
+    объект: один экземпляр на все потоки процесса менялся бы
+    из разных запросов. Если объекта нет, вызывает Http404.
+    """
+    key = _key(model, value)
+    fields = _fields(model)
+    row = local_cache.get(key)
+    if row is None:
+        row = cache.get(key)
+        if row is None:
+            row = model.objects.filter(
+                **{FIELDS[model]: value}
+            ).values_list(*fields).first()
+            if row is None:
+                raise Http404(f'{model._meta.object_name} not found')
+            cache.set(key, row, SHARED_TIMEOUT)
+        local_cache.set(key, row)
+    return model.from_db(DEFAULT_DB_ALIAS, fields, row)
+
+
+def get_group(slug):
+    return get_cached(Group, slug)
+
+
+def get_user(username):
+    return get_cached(User, username)
+
+
+def invalidate(model, *values):
+    """убирает объекты из обоих кэшей"""
+    keys = [_key(model, value) for value in values if value is not None]
+    for key in keys:
+        local_cache.delete(key)
+    cache.delete_many(keys)
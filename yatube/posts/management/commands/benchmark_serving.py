@@ -0,0 +1,113 @@
+import json
+
+from django.core.cache import cache
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi
+from core.http_server import AsgiServer, PooledWSGIServer
+from posts import benchmarks, loadgen
+from posts.models import Group, Post, User
+
+
+def read_paths(count):
+    """адреса лент, профилей и постов из временной базы"""
+    paths = [reverse('posts:index')]
+    paths += [
+        reverse('posts:group_list', args=[slug])
+        for slug in Group.objects.values_list('slug', flat=True)[:count]
+    ]
+    paths += [
+        reverse('posts:profile', args=[username])
+        for username in User.objects.values_list(
+            'username', flat=True
+        )[:count]
+    ]
+    paths += [
+        reverse('posts:post_detail', args=[pk])
+        for pk in Post.objects.values_list('pk', flat=True)[:count]
+    ]
+    return paths
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает WSGI-сервер с пулом потоков и ASGI-путь '
+        'под множеством медленных клиентов на временной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help='потоков у WSGI-сервера и в пуле ASGI'
+        )
+        parser.add_argument('--clients', type=int, default=64)
+        parser.add_argument('--requests-per-client', type=int, default=4)
+        parser.add_argument(
+            '--send-delay', type=float, default=0.05,
+            help='пауза между частями запроса, с'
+        )
+        parser.add_argument(
+            '--read-delay', type=float, default=0.01,
+            help='пауза между чтениями ответа, с'
+        )
+        parser.add_argument('--output', help='куда записать отчет в JSON')
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmarks.seed(
+                users=options['users'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+            )
+            paths = read_paths(10)
+            servers = {
+                'wsgi': PooledWSGIServer(
+                    WSGIHandler(), options['threads'], port=0
+                ),
+                'asgi': AsgiServer(
+                    WsgiToAsgi(WSGIHandler(), workers=options['threads']),
+                    port=0
+                ),
+            }
+            report = {}
+            for name, server in servers.items():
+                cache.clear()
+                server.start()
+                try:
+                    report[name] = loadgen.SlowClients(
+                        server.location, paths,
+                        clients=options['clients'],
+                        requests_per_client=options['requests_per_client'],
+                        send_delay=options['send_delay'],
+                        read_delay=options['read_delay'],
+                    ).run()
+                finally:
+                    server.stop()
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        for name, result in report.items():
+            self.stdout.write(
+                f'{name:5} {result["requests"]:6} запросов  '
+                f'{result["errors"]:4} ошибок  '
+                f'{result["rps"]:8.2f} в секунду  '
+                f'p50 {result["p50_ms"] or 0:8.2f} мс  '
+                f'p95 {result["p95_ms"] or 0:8.2f} мс  '
+                f'p99 {result["p99_ms"] or 0:8.2f} мс'
+            )
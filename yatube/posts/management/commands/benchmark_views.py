@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет число запросов, задержку и выделение памяти '
+        'для views постов на временной базе'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=500)
+        parser.add_argument('--comments', type=int, default=1000)
+        parser.add_argument('--follows', type=int, default=200)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--output', default='benchmark.json',
+            help='куда записать отчет в формате JSON'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='отчет прошлого запуска: рост числа запросов -- ошибка'
+        )
+
+    def handle(self, *args, **options):
+        baseline = (
+            benchmarks.load_report(options['baseline'])
+            if options['baseline'] else None
+        )
+        old_name = connection.settings_dict['NAME']
+        setup_test_environment()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            benchmarks.seed(
+                users=options['users'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+            )
+            report = benchmarks.run(repeat=options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+        benchmarks.save_report(report, options['output'])
+        for name, result in report.items():
+            self.stdout.write(
+                f'{name:18} {result["queries"]:3} запросов  '
+                f'p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'{result["peak_alloc_kb"]:9.1f} КБ'
+            )
+        if baseline is None:
+            return
+        regressions = benchmarks.compare(report, baseline)
+        if regressions:
+            raise CommandError('Выросло число запросов: ' + ', '.join(
+                f'{name} {before} -> {after}'
+                for name, before, after in regressions
+            ))
+        self.stdout.write(self.style.SUCCESS('Число запросов не выросло'))
@@ -0,0 +1,66 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadgen
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сайт смесью чтений и записей '
+        'и выводит пропускную способность и перцентили задержки'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--base-url', default='http://127.0.0.1:8000',
+            help='адрес запущенного сайта с той же базой'
+        )
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument(
+            '--duration', type=float, default=30.0, help='секунд нагрузки'
+        )
+        parser.add_argument(
+            '--requests', type=int, help='остановиться после N запросов'
+        )
+        parser.add_argument(
+            '--mix',
+            help='доли сценариев, например index=30,post_detail=20'
+        )
+        parser.add_argument('--password', default=loadgen.PASSWORD)
+        parser.add_argument('--output', help='куда записать отчет в JSON')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        try:
+            mix = loadgen.parse_mix(options['mix'] or '')
+        except ValueError as exc:
+            raise CommandError(exc)
+        targets = loadgen.Targets()
+        if not targets.readers or not targets.posts:
+            raise CommandError('Нет данных: сначала запустите seed_load')
+        driver = loadgen.LoadDriver(
+            options['base_url'], targets,
+            mix=mix,
+            concurrency=options['concurrency'],
+            duration=options['duration'],
+            total=options['requests'],
+            password=options['password'],
+            random_seed=options['seed'],
+        )
+        report = driver.run()
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+        for name, result in report['scenarios'].items():
+            self.stdout.write(
+                f'{name:16} {result["requests"]:6} запросов  '
+                f'{result["errors"]:4} ошибок  '
+                f'p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'p99 {result["p99_ms"]:8.2f} мс'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего {report["requests"]} запросов за {report["seconds"]} с: '
+            f'{report["rps"]} в секунду, ошибок {report["errors"]}'
+        ))
@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from posts import exporter
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты, комментарии и подписки в JSONL или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--models', nargs='+', choices=list(exporter.EXPORTS),
+            default=list(exporter.EXPORTS)
+        )
+        parser.add_argument(
+            '--format', choices=exporter.FORMATS, default='jsonl'
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='сжимать файлы в gzip'
+        )
+        parser.add_argument(
+            '--output', default='.', help='каталог для файлов выгрузки'
+        )
+
+    def handle(self, *args, **options):
+        os.makedirs(options['output'], exist_ok=True)
+        for name in options['models']:
+            path = os.path.join(options['output'], exporter.filename(
+                name, options['format'], options['gzip']
+            ))
+            size = exporter.export(
+                name, path, options['format'], options['gzip']
+            )
+            self.stdout.write(f'{path}: {size} байт')
+        self.stdout.write(self.style.SUCCESS('Выгрузка завершена'))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        'Импортирует посты из JSONL или CSV: поля author, text, '
+        'group, pub_date, image'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='файл с постами')
+        parser.add_argument('--format', choices=['jsonl', 'csv'])
+        parser.add_argument(
+            '--batch-size', type=int, default=importer.BATCH_SIZE
+        )
+        parser.add_argument(
+            '--workers', type=int, default=importer.IMAGE_WORKERS,
+            help='потоков для копирования картинок'
+        )
+        parser.add_argument(
+            '--image-root', default='',
+            help='каталог, от которого отсчитываются пути картинок'
+        )
+        parser.add_argument(
+            '--create-authors', action='store_true',
+            help='создавать отсутствующих авторов'
+        )
+        parser.add_argument(
+            '--checkpoint',
+            help='файл отметки, по умолчанию <path>.checkpoint'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='продолжить с сохраненной отметки'
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('Размер пачки должен быть больше нуля')
+        checkpoint = options['checkpoint'] or f'{options["path"]}.checkpoint'
+        skip = importer.load_checkpoint(checkpoint) if options['resume'] else 0
+        posts_importer = importer.Importer(
+            create_authors=options['create_authors'],
+            image_root=options['image_root'],
+            image_workers=options['workers'],
+        )
+        try:
+            records = importer.read_records(options['path'], options['format'])
+            for done in posts_importer.run(
+                records, options['batch_size'], skip, checkpoint
+            ):
+                self.stdout.write(f'Обработано записей: {done}')
+        except (OSError, ValueError) as exc:
+            raise CommandError(f'Импорт остановлен: {exc}')
+        stats = posts_importer.stats
+        self.stdout.write(self.style.SUCCESS(
+            f'Импортировано постов: {stats["posts"]}, '
+            f'новых авторов: {stats["authors"]}, '
+            f'пропущено записей: {stats["skipped"]}, '
+            f'ошибок картинок: {stats["image_errors"]}'
+        ))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, подписок и комментариев'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            total = rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитаны счетчики {total} пользователей')
+        )
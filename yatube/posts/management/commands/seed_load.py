@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import loadgen
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу данными для нагрузочных тестов: подписчики '
+        'по закону Ципфа, популярные группы, посты с картинками'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=10000)
+        parser.add_argument('--comments', type=int, default=20000)
+        parser.add_argument(
+            '--follows-per-user', type=int, default=20,
+            help='среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--exponent', type=float, default=1.1,
+            help='показатель закона Ципфа: чем больше, тем сильнее перекос'
+        )
+        parser.add_argument(
+            '--image-share', type=float, default=0.05,
+            help='доля постов с картинкой'
+        )
+        parser.add_argument(
+            '--password', default=loadgen.PASSWORD,
+            help='пароль всех созданных пользователей'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['users'] < 2:
+            raise CommandError('Нужно хотя бы два пользователя')
+        if not 0 <= options['image_share'] <= 1:
+            raise CommandError('Доля постов с картинкой -- от 0 до 1')
+        result = loadgen.seed(
+            users=options['users'],
+            groups=options['groups'],
+            posts=options['posts'],
+            comments=options['comments'],
+            follows_per_user=options['follows_per_user'],
+            exponent=options['exponent'],
+            image_share=options['image_share'],
+            password=options['password'],
+            random_seed=options['seed'],
+            progress=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            'Создано: ' + ', '.join(
+                f'{name} {count}' for name, count in result.items()
+            )
+        ))
@@ -0,0 +1,62 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:28
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def fill_stats(apps, schema_editor):
+    """считает счетчики для уже существующих пользователей"""
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    Comment = apps.get_model('posts', 'Comment')
+    UserStats = apps.get_model('posts', 'UserStats')
+    sources = {
+        'posts': (Post, 'author'),
+        'followers': (Follow, 'author'),
+        'following': (Follow, 'user'),
+        'comments': (Comment, 'author'),
+    }
+    counts = {
+        user_id: dict.fromkeys(sources, 0)
+        for user_id in User.objects.values_list('pk', flat=True)
+    }
+    for field, (model, lookup) in sources.items():
+        rows = model.objects.values_list(lookup).annotate(
+            total=Count('pk')
+        ).order_by()
+        for user_id, total in rows:
+            counts[user_id][field] = total
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id, **fields)
+         for user_id, fields in counts.items()),
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0009_feeditem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='пользователь')),
+                ('posts', models.PositiveIntegerField(default=0, verbose_name='публикации')),
+                ('followers', models.PositiveIntegerField(default=0, verbose_name='подписчики')),
+                ('following', models.PositiveIntegerField(default=0, verbose_name='подписки')),
+                ('comments', models.PositiveIntegerField(default=0, verbose_name='комментарии')),
+            ],
+            options={
+                'verbose_name': 'счетчики пользователя',
+                'verbose_name_plural': 'счетчики пользователей',
+            },
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+from django.db import migrations
+
+CREATE_FTS = (
+    "CREATE VIRTUAL TABLE posts_post_fts USING fts5("
+    "text, tokenize='unicode61 remove_diacritics 2')"
+)
+FILL_FTS = (
+    'INSERT INTO posts_post_fts(rowid, text) SELECT id, text FROM posts_post'
+)
+
+
+def create_fts(apps, schema_editor):
+    """создает полнотекстовый индекс постов, если SQLite умеет FTS5"""
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        if ('ENABLE_FTS5',) not in cursor.fetchall():
+            return
+        cursor.execute(CREATE_FTS)
+        cursor.execute(FILL_FTS)
+
+
+def drop_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_userstats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts, drop_fts),
+    ]
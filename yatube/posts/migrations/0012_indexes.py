@@ -0,0 +1,67 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:34
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    """оставляет по одной подписке на пару пользователь-автор
+    и поправляет счетчики подписок
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first=Min('pk'), total=Count('pk')
+    ).filter(total__gt=1).order_by()
+    for duplicate in list(duplicates):
+        Follow.objects.filter(
+            user=duplicate['user'], author=duplicate['author']
+        ).exclude(pk=duplicate['first']).delete()
+        extra = duplicate['total'] - 1
+        UserStats.objects.filter(user_id=duplicate['author']).update(
+            followers=F('followers') - extra
+        )
+        UserStats.objects.filter(user_id=duplicate['user']).update(
+            following=F('following') - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0011_post_fts'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'подписка', 'verbose_name_plural': 'подписки'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created', '-id'], name='comment_post_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date', '-id'], name='post_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date', '-id'], name='post_author_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date', '-id'], name='post_group_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:21
+
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def fill_updated(apps, schema_editor):
+    """у старых постов дата изменения -- дата публикации"""
+    Post = apps.get_model('posts', 'Post')
+    Post.objects.update(updated=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='updated',
+            field=models.DateTimeField(
+                auto_now=True,
+                default=timezone.now,
+                verbose_name='дата изменения'
+            ),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fill_updated, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:10
+
+from django.core.files.images import get_image_dimensions
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def fill_image_size(apps, schema_editor):
+    """размеры уже загруженных картинок; читается только заголовок"""
+    Post = apps.get_model('posts', 'Post')
+    changed = []
+    for post in Post.objects.exclude(image='').only('pk', 'image').iterator():
+        try:
+            with default_storage.open(post.image.name) as file:
+                width, height = get_image_dimensions(file)
+        except Exception:
+            continue
+        post.image_width, post.image_height = width, height
+        changed.append(post)
+    Post.objects.bulk_update(
+        changed, ['image_width', 'image_height'], batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True, verbose_name='ширина картинки'),
+        ),
+        migrations.RunPython(fill_image_size, migrations.RunPython.noop),
+    ]
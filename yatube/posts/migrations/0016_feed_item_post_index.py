@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 21:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_image_size'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='feeditem',
+            name='feed_user_pub_date_idx',
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-post'], name='feed_user_pub_date_post_idx'),
+        ),
+    ]
@@ -47,6 +47,29 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    # размеры пишет форма при загрузке: width_field/height_field
+    # открывали бы файл при каждом создании объекта без размеров
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='ширина картинки'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='высота картинки'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='версия'
+    )
+    updated = models.DateTimeField(
+        auto_now=True,
+        verbose_name='дата изменения'
+    )
 
     def __str__(self):
         """выводит текст поста."""
@@ -59,6 +82,20 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'публикация'
         verbose_name_plural = 'публикации'
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'],
+                name='post_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+        ]
 
 
 class Comment (models.Model):
@@ -95,6 +132,12 @@ class Comment (models.Model):
         ordering = ['-created']
         verbose_name = 'комментарий'
         verbose_name_plural = 'комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-created', '-id'],
+                name='comment_post_created_idx'
+            ),
+        ]
 
 
 class Follow (models.Model):
@@ -110,3 +153,91 @@ class Follow (models.Model):
         related_name='following',
         verbose_name='автор'
     )
+
+    class Meta:
+        """одна подписка на пару пользователь-автор
+        и индекс для выборки подписчиков автора
+        """
+        verbose_name = 'подписка'
+        verbose_name_plural = 'подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'],
+                name='follow_author_user_idx'
+            ),
+        ]
+
+
+class FeedItem(models.Model):
+    """Запись в ленте подписок пользователя.
+    Заполняется при публикации поста (fan-out on write),
+    pub_date копируется из поста, чтобы лента читалась
+    одним проходом по индексу (user, -pub_date, -post).
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='пользователь'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='автор'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='публикация'
+    )
+    pub_date = models.DateTimeField(verbose_name='дата публикации')
+
+    class Meta:
+        """сортировка по дате, индекс для чтения ленты
+        и защита от дублей
+        """
+        ordering = ['-pub_date']
+        verbose_name = 'запись ленты'
+        verbose_name_plural = 'записи ленты'
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_post_idx'
+            ),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_item'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счетчики пользователя.
+    Обновляются сигналами при создании и удалении постов,
+    подписок и комментариев.
+    """
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='пользователь'
+    )
+    posts = models.PositiveIntegerField('публикации', default=0)
+    followers = models.PositiveIntegerField('подписчики', default=0)
+    following = models.PositiveIntegerField('подписки', default=0)
+    comments = models.PositiveIntegerField('комментарии', default=0)
+
+    class Meta:
+        verbose_name = 'счетчики пользователя'
+        verbose_name_plural = 'счетчики пользователей'
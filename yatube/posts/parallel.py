@@ -0,0 +1,44 @@
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+from core.executors import LazyExecutor
+from core.middleware import profiled_thread
+
+_executor = LazyExecutor(lambda: ThreadPoolExecutor(
+    max_workers=settings.VIEW_FETCH_WORKERS, thread_name_prefix='fetch'
+))
+
+
+def _run(func):
+    try:
+        with profiled_thread():
+            return func()
+    finally:
+        close_old_connections()
+
+
+def gather(*funcs):
+    """Выполняет независимые выборки одновременно и возвращает
+    их результаты по порядку. Первая идет в текущем потоке,
+    остальные -- в пуле VIEW_FETCH_WORKERS со своими соединениями
+    и контекстом запроса (маршрутизацией на реплики, профилированием).
+    Внутри транзакции другие соединения не видят ее изменений,
+    поэтому там и при VIEW_FETCH_WORKERS = 0 все идет по очереди.
+    """
+    if (not settings.VIEW_FETCH_WORKERS or len(funcs) < 2
+            or connection.in_atomic_block):
+        return [func() for func in funcs]
+    futures = [
+        _executor.submit(contextvars.copy_context().run, _run, func)
+        for func in funcs[1:]
+    ]
+    return [funcs[0]()] + [future.result() for future in futures]
+
+
+def loaded(page):
+    """страница с уже выполненным запросом за ее объектами"""
+    page.object_list = list(page.object_list)
+    return page
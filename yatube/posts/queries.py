@@ -0,0 +1,21 @@
+from .models import Comment, Post
+
+
+def index_posts():
+    """посты главной страницы"""
+    return Post.objects.select_related('group', 'author')
+
+
+def group_posts(group):
+    """посты группы"""
+    return group.posts.select_related('group', 'author')
+
+
+def profile_posts(author):
+    """посты автора"""
+    return author.posts.select_related('group')
+
+
+def post_comments(post_id):
+    """комментарии к посту"""
+    return Comment.objects.filter(post_id=post_id).select_related('author')
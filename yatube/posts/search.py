@@ -0,0 +1,179 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+
+from .models import Post
+
+FTS_TABLE: str = 'posts_post_fts'
+# сколько самых новых совпадений ранжируется: частое слово
+# иначе заставит считать bm25 каждого совпадения на каждой странице
+MAX_RANKED: int = 1000
+WORD = re.compile(r'\w+')
+
+_fts_tables = {}
+
+
+def fts_enabled():
+    """есть ли в базе полнотекстовый индекс FTS5"""
+    if connection.vendor != 'sqlite':
+        return False
+    if connection.alias not in _fts_tables:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                'AND name = %s', [FTS_TABLE]
+            )
+            _fts_tables[connection.alias] = cursor.fetchone() is not None
+    return _fts_tables[connection.alias]
+
+
+def index_post(post):
+    """добавляет или обновляет пост в индексе"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk]
+        )
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [post.pk, post.text]
+        )
+
+
+def index_posts(posts):
+    """добавляет в индекс пачку новых постов"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+            [(post.pk, post.text) for post in posts]
+        )
+
+
+def unindex_post(post_id):
+    """убирает пост из индекса"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+        )
+
+
+def rebuild():
+    """заново строит индекс по всем постам"""
+    if not fts_enabled():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE}(rowid, text) '
+            'SELECT id, text FROM posts_post'
+        )
+
+
+def match_expression(query):
+    """Превращает строку поиска в выражение FTS5.
+    Каждое слово ищется как префикс, все слова обязательны.
+    """
+    return ' '.join(f'"{word}"*' for word in WORD.findall(query.lower()))
+
+
+def encode_cursor(rank, pk):
+    raw = f'{rank!r}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """распаковывает курсор выдачи, для битого курсора возвращает None"""
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        rank, pk = raw.rsplit('|', 1)
+        return float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+class SearchPage:
+    """Страница выдачи поиска: посты в порядке релевантности
+    и курсор следующей страницы.
+    """
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def _ranked_ids(expression, position, limit):
+    """Id постов, отсортированные по bm25, начиная после position.
+    Ранжируются только MAX_RANKED самых новых совпадений: нижняя
+    граница rowid передается в FTS5, и он оценивает лишь их. Страница
+    по курсору (rank, rowid) выбирается из этого списка.
+    """
+    sql = (
+        f'SELECT rowid, rank FROM {FTS_TABLE} '
+        f'WHERE {FTS_TABLE} MATCH %s AND rowid >= COALESCE(('
+        f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+        'ORDER BY rowid DESC LIMIT 1 OFFSET %s), 0)'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [expression, expression, MAX_RANKED - 1])
+        rows = sorted(cursor.fetchall(), key=lambda row: (row[1], row[0]))
+    if position is not None:
+        rank, pk = position
+        rows = [row for row in rows if (row[1], row[0]) > (rank, pk)]
+    return rows[:limit]
+
+
+def _fallback_ids(query, position, limit):
+    """поиск без индекса, для баз без FTS5: новые посты первыми"""
+    posts = Post.objects.all()
+    for word in WORD.findall(query):
+        posts = posts.filter(text__icontains=word)
+    if position is not None:
+        posts = posts.filter(pk__lt=position[1])
+    return [(pk, 0.0) for pk in posts.order_by('-pk').values_list(
+        'pk', flat=True
+    )[:limit]]
+
+
+def search_posts(query, cursor, per_page):
+    """страница найденных постов, отсортированных по релевантности"""
+    expression = match_expression(query)
+    if not expression:
+        return SearchPage([])
+    position = decode_cursor(cursor)
+    if fts_enabled():
+        rows = _ranked_ids(expression, position, per_page + 1)
+    else:
+        rows = _fallback_ids(query, position, per_page + 1)
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last_pk, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, last_pk)
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        [pk for pk, _ in rows]
+    )
+    return SearchPage(
+        [posts[pk] for pk, _ in rows if pk in posts], next_cursor
+    )
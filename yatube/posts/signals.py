@@ -0,0 +1,198 @@
+from django.db.models.signals import (post_delete, post_init, post_save,
+                                      pre_delete, pre_save)
+from django.db.models import F
+from django.db.models.expressions import CombinedExpression
+from django.dispatch import receiver
+
+from . import caching, counters, feed, fragments, lookups, search
+from .models import Comment, Follow, Group, Post, User
+
+# поля пользователя, которые видны на странице автора
+AUTHOR_FIELDS = {'username', 'first_name', 'last_name'}
+
+
+# счетчики подключаются первыми: остальные обработчики их читают
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Follow)
+@receiver(post_save, sender=Comment)
+def increment_counters(sender, instance, created, **kwargs):
+    """новые посты, подписки и комментарии увеличивают счетчики"""
+    if created:
+        _change_counters(instance, 1)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Follow)
+@receiver(post_delete, sender=Comment)
+def decrement_counters(sender, instance, **kwargs):
+    """удаленные посты, подписки и комментарии уменьшают счетчики"""
+    _change_counters(instance, -1)
+
+
+def _change_counters(instance, delta):
+    if isinstance(instance, Post):
+        counters.change(instance.author_id, 'posts', delta)
+    elif isinstance(instance, Follow):
+        counters.change(instance.author_id, 'followers', delta)
+        counters.change(instance.user_id, 'following', delta)
+    else:
+        counters.change(instance.author_id, 'comments', delta)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """новый пост попадает в ленты подписчиков автора"""
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, **kwargs):
+    """при подписке в ленту добавляются посты автора"""
+    if created:
+        feed.backfill(instance.user, instance.author)
+        caching.bump_version(caching.feed_namespace(instance.user_id))
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    """при отписке посты автора убираются из ленты"""
+    feed.prune(instance.user_id, instance.author_id)
+    feed.unfollowed(instance.author_id)
+    caching.bump_version(caching.feed_namespace(instance.user_id))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_posts_version(sender, **kwargs):
+    """изменение постов и групп сбрасывает кэш страниц с постами"""
+    caching.bump_version(caching.POSTS)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comments_version(sender, **kwargs):
+    """изменение комментариев сбрасывает кэш страниц с комментариями"""
+    caching.bump_version(caching.COMMENTS)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    """текст поста попадает в полнотекстовый индекс"""
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    """удаленный пост убирается из полнотекстового индекса"""
+    search.unindex_post(instance.pk)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_lookup_value(sender, instance, update_fields=None, **kwargs):
+    """запоминает старый slug или username, чтобы сбросить его ключ"""
+    field = lookups.FIELDS[sender]
+    if instance.pk is None or (
+        update_fields is not None and field not in update_fields
+    ):
+        return
+    instance._old_lookup_value = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(field, flat=True).first()
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_lookup(sender, instance, **kwargs):
+    """измененные группы и пользователи убираются из кэша поиска"""
+    lookups.invalidate(
+        sender,
+        getattr(instance, lookups.FIELDS[sender]),
+        getattr(instance, '_old_lookup_value', None),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def bump_post_version(sender, instance, update_fields=None, **kwargs):
+    """Измененный пост получает новую версию карточки.
+    Версия увеличивается в том же UPDATE, что пишет пост, поэтому
+    одновременные правки получают разные версии.
+    """
+    if instance.pk is None or (
+        update_fields is not None and 'version' not in update_fields
+    ):
+        return
+    instance.version = F('version') + 1
+
+
+@receiver(post_save, sender=Post)
+def refresh_post_version(sender, instance, **kwargs):
+    """читает записанную версию вместо выражения F"""
+    if isinstance(instance.version, CombinedExpression):
+        instance.refresh_from_db(fields=['version'])
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def bump_group_posts_versions(sender, instance, created=False, **kwargs):
+    """изменение группы меняет ссылку в карточках ее постов"""
+    if not created:
+        fragments.bump_versions(group=instance)
+
+
+@receiver(post_save, sender=User)
+def bump_author_posts_versions(sender, instance, created, update_fields=None,
+                               **kwargs):
+    """смена имени автора меняет карточки его постов"""
+    if created or (update_fields is not None
+                   and 'username' not in update_fields):
+        return
+    old = getattr(instance, '_old_lookup_value', None)
+    if old is not None and old != instance.username:
+        fragments.bump_versions(author=instance)
+        caching.bump_version(caching.POSTS)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_post_comments(sender, instance, **kwargs):
+    """комментарии меняют страницу поста"""
+    caching.bump_version(caching.comments_namespace(instance.post_id))
+
+
+@receiver(post_init, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    """группа поста при загрузке: при смене меняются обе страницы"""
+    instance._loaded_group_id = instance.__dict__.get('group_id')
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_pages(sender, instance, **kwargs):
+    """пост меняет страницы своего автора и групп, новой и прежней"""
+    caching.bump_version(caching.author_namespace(instance.author_id))
+    for group_id in {instance.group_id, instance._loaded_group_id} - {None}:
+        caching.bump_version(caching.group_namespace(group_id))
+    instance._loaded_group_id = instance.group_id
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_page(sender, instance, **kwargs):
+    """название и описание группы -- на ее странице"""
+    caching.bump_version(caching.group_namespace(instance.pk))
+
+
+@receiver(post_save, sender=User)
+def bump_author_page(sender, instance, created, update_fields=None,
+                     **kwargs):
+    """имя автора -- на его странице"""
+    if created or (update_fields is not None
+                   and not AUTHOR_FIELDS & set(update_fields)):
+        return
+    caching.bump_version(caching.author_namespace(instance.pk))
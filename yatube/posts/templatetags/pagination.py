@@ -0,0 +1,11 @@
+from django import template
+
+from posts.utils import page_window as get_page_window
+
+register = template.Library()
+
+
+@register.filter
+def page_window(page):
+    """номера страниц вокруг текущей, None на месте пропуска"""
+    return get_page_window(page)
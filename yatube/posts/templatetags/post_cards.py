@@ -0,0 +1,11 @@
+from django import template
+
+from posts import fragments
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_cards(posts, show_author=True):
+    """html карточек постов страницы из кэша фрагментов"""
+    return fragments.render_cards(posts, show_author)
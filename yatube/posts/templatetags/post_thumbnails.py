@@ -0,0 +1,29 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_picture(post):
+    """Набор готовых миниатюр картинки поста для <img srcset>:
+    браузер сам выбирает ширину по sizes и плотности экрана.
+    None, если ни одной миниатюры еще нет.
+    """
+    ready = thumbnails.get_ready_set(post.image, post.image_width)
+    if not ready:
+        return None
+    # src -- основная миниатюра, если она уже готова
+    fallback = dict(ready).get(
+        int(thumbnails.POST_GEOMETRY.split('x')[0]), ready[-1][1]
+    )
+    return {
+        'src': fallback.url,
+        'srcset': ', '.join(
+            f'{thumbnail.url} {width}w' for width, thumbnail in ready
+        ),
+        'sizes': thumbnails.POST_SIZES,
+        'width': fallback.width,
+        'height': fallback.height,
+    }
@@ -0,0 +1,111 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import COUNT_OF_POSTS
+
+User = get_user_model()
+
+
+class ApiTests(TestCase):
+    """Тестирование JSON API лент"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем посты, комментарий и подписку"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(COUNT_OF_POSTS + 3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.index = reverse('posts:api_index')
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_feeds(self):
+        """ленты отдают посты страницами по курсору"""
+        urls = [
+            reverse('posts:api_index'),
+            reverse('posts:api_group_list', args=[self.group.slug]),
+            reverse('posts:api_profile', args=[self.author.username]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.guest_client.get(url).json()
+                self.assertEqual(len(first['results']), COUNT_OF_POSTS)
+                self.assertEqual(first['results'][0], {
+                    'id': self.posts[-1].pk,
+                    'text': self.posts[-1].text,
+                    'pub_date': first['results'][0]['pub_date'],
+                    'author': 'author',
+                    'group': 'test-slug',
+                    'image': None,
+                })
+                second = self.guest_client.get(
+                    url, {'cursor': first['next']}
+                ).json()
+                self.assertEqual(len(second['results']), 3)
+                self.assertIsNone(second['next'])
+                self.assertEqual(second['results'][-1]['id'],
+                                 self.posts[0].pk)
+
+    def test_post_detail(self):
+        """пост отдается вместе с комментариями"""
+        data = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[self.posts[0].pk])
+        ).json()
+        self.assertEqual(data['post']['text'], self.posts[0].text)
+        self.assertEqual(data['comments']['results'][0]['text'],
+                         self.comment.text)
+        response = self.guest_client.get(
+            reverse('posts:api_post_detail', args=[10 ** 6])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_feed(self):
+        """лента подписок только для вошедших пользователей"""
+        url = reverse('posts:api_follow_index')
+        self.assertEqual(self.guest_client.get(url).status_code, 401)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(len(data['results']), COUNT_OF_POSTS)
+
+    def test_not_modified(self):
+        """неизменная лента отдает 304 без запросов к базе"""
+        response = self.guest_client.get(self.index)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                self.index, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+        Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(self.index, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_feed_etag(self):
+        """подписка меняет ETag ленты подписок"""
+        url = reverse('posts:api_follow_index')
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.filter(user=self.reader).delete()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'], [])
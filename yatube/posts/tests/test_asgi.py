@@ -0,0 +1,187 @@
+import asyncio
+import threading
+
+import requests
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.asgi import WsgiToAsgi
+from core.http_server import AsgiServer, PooledWSGIServer
+from core.routers import read_replica
+from posts import loadgen
+from posts.parallel import gather
+
+
+def echo(environ, start_response):
+    """WSGI-приложение, возвращающее то, что получило"""
+    body = environ['wsgi.input'].read(
+        int(environ.get('CONTENT_LENGTH') or 0)
+    )
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [
+        f'{environ["REQUEST_METHOD"]} {environ["PATH_INFO"]}'
+        f'?{environ["QUERY_STRING"]} {environ.get("HTTP_COOKIE")}'
+        f' {environ.get("CONTENT_TYPE")} '.encode() + body
+    ]
+
+
+class Stream:
+    streaming = True
+    closed = False
+
+    def __iter__(self):
+        yield b'first,'
+        yield b''
+        yield b'second'
+
+    def close(self):
+        self.closed = True
+
+
+def call(app, scope, messages):
+    """вызывает ASGI-приложение, возвращает отправленные им сообщения"""
+    sent = []
+    messages = list(messages)
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+def http_scope(method='GET', path='/', query=b'', headers=()):
+    return {
+        'type': 'http', 'method': method, 'path': path,
+        'query_string': query, 'headers': list(headers),
+        'http_version': '1.1', 'client': ('127.0.0.1', 5000),
+    }
+
+
+class AdapterTests(SimpleTestCase):
+    """Тестирование ASGI-обертки над WSGI"""
+
+    def test_request_reaches_wsgi_application(self):
+        sent = call(WsgiToAsgi(echo, workers=1), http_scope(
+            'POST', '/path/', b'a=1', headers=[
+                (b'cookie', b'a=1'), (b'cookie', b'b=2'),
+                (b'content-type', b'text/plain'), (b'content-length', b'18'),
+            ]
+        ), [
+            {'type': 'http.request', 'body': b'part one, ',
+             'more_body': True},
+            {'type': 'http.request', 'body': b'part two'},
+        ])
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn((b'content-type', b'text/plain'), sent[0]['headers'])
+        self.assertEqual(
+            sent[1]['body'].decode(),
+            'POST /path/?a=1 a=1; b=2 text/plain part one, part two'
+        )
+
+    def test_streaming_response_sent_in_parts(self):
+        stream = Stream()
+
+        def app(environ, start_response):
+            start_response('200 OK', [])
+            return stream
+
+        sent = call(WsgiToAsgi(app, workers=1), http_scope(), [
+            {'type': 'http.request'}
+        ])
+        self.assertEqual(
+            [message.get('body') for message in sent],
+            [None, b'first,', b'second', b'']
+        )
+        self.assertTrue(sent[1]['more_body'])
+        self.assertTrue(stream.closed)
+
+    def test_disconnect_before_body(self):
+        sent = call(WsgiToAsgi(echo, workers=1), http_scope('POST'), [
+            {'type': 'http.disconnect'}
+        ])
+        self.assertEqual(sent, [])
+
+    def test_lifespan(self):
+        sent = call(WsgiToAsgi(echo, workers=1), {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}
+        ])
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+    def test_django_page(self):
+        sent = call(
+            WsgiToAsgi(WSGIHandler(), workers=1),
+            http_scope(path=reverse('about:author')),
+            [{'type': 'http.request'}]
+        )
+        self.assertEqual(sent[0]['status'], 200)
+        self.assertIn('Об авторе'.encode(), sent[1]['body'])
+
+
+class ServerTests(SimpleTestCase):
+    """Тестирование серверов для замеров"""
+
+    def check_server(self, server):
+        server.start()
+        try:
+            response = requests.post(
+                server.location + '/form/?q=1', data=b'x' * 100000,
+                headers={'Content-Type': 'text/plain'}, timeout=10
+            )
+            report = loadgen.SlowClients(
+                server.location, ['/one/', '/two/'], clients=8,
+                requests_per_client=2, send_delay=0.01, read_delay=0
+            ).run()
+        finally:
+            server.stop()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.content,
+            b'POST /form/?q=1 None text/plain ' + b'x' * 100000
+        )
+        self.assertEqual((report['requests'], report['errors']), (16, 0))
+
+    def test_asgi_server(self):
+        self.check_server(AsgiServer(WsgiToAsgi(echo, workers=2), port=0))
+
+    def test_pooled_wsgi_server(self):
+        self.check_server(PooledWSGIServer(echo, 2, port=0))
+
+
+class GatherTests(SimpleTestCase):
+    """Тестирование одновременных выборок"""
+
+    @override_settings(VIEW_FETCH_WORKERS=2)
+    def test_runs_in_pool_with_request_context(self):
+        token = read_replica.set('replica')
+        try:
+            results = gather(*(
+                lambda: (threading.current_thread(), read_replica.get())
+                for _ in range(3)
+            ))
+        finally:
+            read_replica.reset(token)
+        threads = [thread for thread, _ in results]
+        self.assertIs(threads[0], threading.current_thread())
+        for thread in threads[1:]:
+            self.assertTrue(thread.name.startswith('fetch'))
+        self.assertEqual([replica for _, replica in results], ['replica'] * 3)
+
+    @override_settings(VIEW_FETCH_WORKERS=0)
+    def test_sequential_without_workers(self):
+        self.assertEqual(gather(lambda: 1, lambda: 2), [1, 2])
+
+
+class GatherInTransactionTests(TestCase):
+    """внутри транзакции другие потоки не видят ее данных"""
+
+    @override_settings(VIEW_FETCH_WORKERS=2)
+    def test_sequential_in_transaction(self):
+        threads = gather(*(threading.current_thread for _ in range(3)))
+        self.assertEqual(threads, [threading.current_thread()] * 3)
@@ -0,0 +1,26 @@
+import os
+
+from django.test import TestCase
+
+from posts import benchmarks
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), 'query_budget.json')
+
+
+class QueryBudgetTests(TestCase):
+    """Число запросов views не должно расти.
+    Бюджет -- отчет команды benchmark_views
+    с теми же параметрами заполнения.
+    """
+    @classmethod
+    def setUpClass(cls):
+        """заполняем базу небольшим набором данных"""
+        super().setUpClass()
+        benchmarks.seed(users=10, posts=30, comments=60, follows=15)
+
+    def test_query_counts_do_not_grow(self):
+        """ни один view не делает больше запросов, чем в бюджете"""
+        report = benchmarks.run(repeat=2)
+        budget = benchmarks.load_report(BUDGET_PATH)
+        self.assertEqual(set(report), set(budget))
+        self.assertEqual(benchmarks.compare(report, budget), [])
@@ -0,0 +1,213 @@
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from core.cache import RespCache
+from core.resp_server import RespServer
+from posts import caching
+from posts.models import Post
+
+User = get_user_model()
+
+
+class StandInServerMixin:
+    """запускает локальную замену Redis на свободном порту"""
+    @classmethod
+    def setUpClass(cls):
+        cls.server = RespServer(port=0)
+        cls.server.start()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.server.stop()
+
+    def tiered_caches(self):
+        return {
+            'default': {
+                'BACKEND': 'core.cache.TieredCache',
+                'OPTIONS': {'L1': 'local', 'L2': 'shared', 'L1_TIMEOUT': 5},
+            },
+            'local': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                'LOCATION': 'test-l1',
+            },
+            'shared': {
+                'BACKEND': 'core.cache.RespCache',
+                'LOCATION': self.server.location,
+            },
+        }
+
+
+class RespCacheTests(StandInServerMixin, SimpleTestCase):
+    """Тестирование кэша с протоколом Redis"""
+
+    def setUp(self):
+        self.cache = RespCache(self.server.location, {})
+        self.cache.clear()
+
+    def test_get_set_delete(self):
+        """значения сохраняются, читаются и удаляются"""
+        values = {
+            'int': 42,
+            'text': 'Пост',
+            'dict': {'posts': [1, 2]},
+            'bytes': b'\x00\x80',
+        }
+        for key, value in values.items():
+            with self.subTest(key=key):
+                self.cache.set(key, value)
+                self.assertEqual(self.cache.get(key), value)
+        self.cache.delete('int')
+        self.assertIsNone(self.cache.get('int'))
+        self.assertEqual(self.cache.get('int', 'нет'), 'нет')
+
+    def test_many(self):
+        """get_many и set_many работают одним обращением"""
+        self.cache.set_many({'a': 1, 'b': 'два'})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'c']), {'a': 1, 'b': 'два'}
+        )
+        self.cache.delete_many(['a', 'b'])
+        self.assertEqual(self.cache.get_many(['a', 'b']), {})
+
+    def test_add_and_incr(self):
+        """add не перезаписывает ключ, incr меняет число на сервере"""
+        self.assertTrue(self.cache.add('lock', 1))
+        self.assertFalse(self.cache.add('lock', 2))
+        self.assertEqual(self.cache.incr('lock', 5), 6)
+        self.assertEqual(self.cache.decr('lock'), 5)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_incr_is_one_command(self):
+        """incr не создает удаленный ключ и не трогает не числа"""
+        with mock.patch.object(
+            self.cache, '_execute', wraps=self.cache._execute
+        ) as execute:
+            with self.assertRaises(ValueError):
+                self.cache.incr('missing')
+        execute.assert_called_once()
+        self.assertFalse(self.cache.has_key('missing'))
+        self.cache.set('text', 'Пост')
+        with self.assertRaises(ValueError):
+            self.cache.incr('text')
+        self.assertEqual(self.cache.get('text'), 'Пост')
+
+    def test_timeout(self):
+        """ключ пропадает по истечении срока"""
+        self.cache.set('short', 1, 0.05)
+        self.cache.set('forever', 1, None)
+        self.cache.set('gone', 1, 0)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.has_key('forever'))
+        self.assertFalse(self.cache.has_key('gone'))
+
+    def test_connections_are_pooled(self):
+        """кэши разных потоков используют один пул соединений"""
+        other = RespCache(self.server.location, {})
+        self.assertIs(self.cache._pool, other._pool)
+        for _ in range(10):
+            self.cache.get('key')
+        self.assertEqual(self.cache._pool._idle.qsize(), 1)
+
+
+class TieredCacheTests(StandInServerMixin, SimpleTestCase):
+    """Тестирование двухуровневого кэша"""
+
+    def setUp(self):
+        self.override = override_settings(CACHES=self.tiered_caches())
+        self.override.enable()
+        caches['default'].clear()
+
+    def tearDown(self):
+        self.override.disable()
+
+    def test_l2_hit_fills_l1(self):
+        """значение из общего кэша попадает в кэш процесса"""
+        caches['shared'].set('key', 'значение')
+        self.assertIsNone(caches['local'].get('key'))
+        self.assertEqual(caches['default'].get('key'), 'значение')
+        self.assertEqual(caches['local'].get('key'), 'значение')
+        caches['shared'].delete('key')
+        self.assertEqual(caches['default'].get('key'), 'значение')
+
+    def test_writes_go_to_both_levels(self):
+        """запись и удаление меняют оба уровня"""
+        caches['default'].set_many({'a': 1, 'b': 2})
+        self.assertEqual(caches['shared'].get_many(['a', 'b']),
+                         {'a': 1, 'b': 2})
+        self.assertEqual(caches['default'].get_many(['a', 'b']),
+                         {'a': 1, 'b': 2})
+        caches['default'].delete('a')
+        self.assertIsNone(caches['local'].get('a'))
+        self.assertIsNone(caches['shared'].get('a'))
+
+    def test_incr_uses_shared_counter(self):
+        """счетчик живет в общем кэше, старое значение L1 сбрасывается"""
+        caches['default'].set('version', 1)
+        caches['shared'].incr('version')
+        self.assertEqual(caches['default'].incr('version'), 3)
+        self.assertEqual(caches['default'].get('version'), 3)
+
+
+class TieredPageCacheTests(StandInServerMixin, TestCase):
+    """Тестирование кэша страниц через локальную замену Redis"""
+
+    def setUp(self):
+        self.override = override_settings(CACHES=self.tiered_caches())
+        self.override.enable()
+        caches['default'].clear()
+        self.author = User.objects.create_user(username='author')
+        self.post = Post.objects.create(author=self.author, text='Пост')
+
+    def tearDown(self):
+        caches['default'].clear()
+        self.override.disable()
+
+    def test_shared_versions_kept(self):
+        """в общем кэше версии бессрочны, страницы живут сутки"""
+        self.assertIsNone(caching._timeout())
+        self.assertEqual(
+            caching._timeout(caching.PAGE_CACHE_TIMEOUT),
+            caching.PAGE_CACHE_TIMEOUT
+        )
+
+    def test_index_served_from_shared_cache(self):
+        """страница из общего кэша видна без кэша процесса"""
+        client = Client()
+        client.get(reverse('posts:index'))
+        caches['local'].clear()
+        response = client.get(reverse('posts:index'))
+        self.assertIsNone(response.context)
+        self.assertContains(response, self.post.text)
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+}})
+class ProcessLocalCacheTests(SimpleTestCase):
+    """Кэш процесса не видит версий, повышенных другими воркерами,
+    поэтому версии и страницы в нем живут недолго
+    """
+
+    def setUp(self):
+        cache.clear()
+
+    def test_page_timeout_is_short(self):
+        self.assertEqual(
+            caching._timeout(caching.PAGE_CACHE_TIMEOUT),
+            caching.LOCAL_TIMEOUT
+        )
+
+    @mock.patch('posts.caching.LOCAL_TIMEOUT', 0.05)
+    def test_version_expires(self):
+        version = caching.get_version('test')
+        time.sleep(0.1)
+        self.assertNotEqual(caching.get_version('test'), version)
@@ -0,0 +1,101 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ExportTests(TestCase):
+    """Тестирование выгрузки постов, комментариев и подписок"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем посты, комментарии и подписку"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def export(self, *args):
+        call_command(
+            'export_yatube', '--output', self.directory, *args,
+            stdout=StringIO()
+        )
+
+    def test_export_jsonl_gzip(self):
+        """выгрузка в jsonl.gz содержит все строки"""
+        self.export('--gzip')
+        expected = {'posts': 3, 'comments': 1, 'follows': 1}
+        for name, total in expected.items():
+            with self.subTest(name=name):
+                path = os.path.join(self.directory, f'{name}.jsonl.gz')
+                with gzip.open(path, 'rt', encoding='utf-8') as file:
+                    rows = [json.loads(line) for line in file]
+                self.assertEqual(len(rows), total)
+        path = os.path.join(self.directory, 'posts.jsonl.gz')
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            row = json.loads(file.readline())
+        self.assertEqual(row['text'], 'Пост 0')
+        self.assertEqual(row['author__username'], 'author')
+        self.assertEqual(row['group__slug'], 'test-slug')
+
+    def test_export_csv(self):
+        """выгрузка в csv начинается с заголовка"""
+        self.export('--models', 'follows', '--format', 'csv')
+        path = os.path.join(self.directory, 'follows.csv')
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows, [{
+            'id': str(Follow.objects.get().pk),
+            'user__username': 'reader',
+            'author__username': 'author',
+        }])
+        self.assertFalse(
+            os.path.exists(os.path.join(self.directory, 'posts.csv'))
+        )
+
+    def test_admin_action_streams_selected(self):
+        """действие админки отдает выбранные посты потоком"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_selected',
+            '_selected_action': [self.posts[0].pk, self.posts[1].pk],
+        })
+        self.assertTrue(response.streaming)
+        content = gzip.decompress(b''.join(response.streaming_content))
+        texts = [json.loads(line)['text'] for line in content.splitlines()]
+        self.assertEqual(texts, ['Пост 0', 'Пост 1'])
@@ -1,12 +1,15 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import transaction
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from posts import thumbnails
 from posts.models import Comment, Group, Post
 from posts.tests.help_func import check_labels, check_labels_comments
 
@@ -35,6 +38,7 @@ class PostFormTests(TestCase):
             b'\x02\x00\x01\x00\x00\x02\x02\x0C'
             b'\x0A\x00\x3B'
         )
+        cls.small_gif = small_gif
         uploaded = SimpleUploadedFile(
             name='small.gif',
             content=small_gif,
@@ -140,3 +144,65 @@ class PostFormTests(TestCase):
         )
         self.assertEqual(Comment.objects.count(), comment_count + 1)
         check_labels_comments(self)
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_create_post_prepares_thumbnail(self):
+        """миниатюра загруженной картинки создается при публикации"""
+        uploaded = SimpleUploadedFile(
+            name='thumb.gif',
+            content=self.small_gif,
+            content_type='image/gif'
+        )
+        self.authorized_author.post(
+            reverse(self.post_create[0]),
+            data={'text': 'Пост с картинкой', 'image': uploaded},
+        )
+        post = Post.objects.get(text='Пост с картинкой')
+        self.assertIsNotNone(thumbnails.backend.lookup(
+            post.image,
+            thumbnails.POST_GEOMETRY,
+            **thumbnails.POST_OPTIONS
+        ))
+
+    def test_page_does_not_wait_for_thumbnail(self):
+        """пока миниатюры нет, страница показывает заглушку"""
+        post = Post.objects.create(
+            author=self.author,
+            text='Пост без миниатюры',
+            image=SimpleUploadedFile(
+                name='fresh.gif',
+                content=self.small_gif,
+                content_type='image/gif'
+            )
+        )
+        with mock.patch('posts.thumbnails.queue') as queue:
+            response = self.authorized_author.get(
+                reverse(self.post_detail[0], args=[post.id])
+            )
+        queue.assert_called_once_with(
+            post.image.name,
+            thumbnails.post_geometries(),
+            thumbnails.POST_OPTIONS
+        )
+        self.assertContains(response, 'bg-light')
+        self.assertNotContains(response, '<img class="card-img')
+
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def test_inline_thumbnail_keeps_connection(self):
+        """без фоновых потоков соединение запроса не закрывается"""
+        with mock.patch('posts.thumbnails.close_old_connections') as close, \
+                mock.patch.object(thumbnails.backend, 'get_thumbnail') as get:
+            thumbnails.queue('posts/inline.gif')
+        get.assert_called_once()
+        close.assert_not_called()
+
+    @override_settings(THUMBNAIL_WORKERS=1)
+    def test_rolled_back_thumbnail_not_pending(self):
+        """при откате транзакции задача не остается в очереди"""
+        with self.assertRaises(ValueError), transaction.atomic():
+            thumbnails.queue('posts/rolled_back.gif')
+            raise ValueError
+        self.assertNotIn(
+            ('posts/rolled_back.gif', thumbnails.POST_GEOMETRY),
+            thumbnails._pending
+        )
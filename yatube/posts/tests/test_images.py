@@ -0,0 +1,185 @@
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from posts import images, thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+ORIENTATION = 0x0112
+MAKE = 0x010F
+
+
+def make_image(size, mode='RGB', image_format='JPEG', orientation=None):
+    image = Image.new(mode, size, (200, 30, 30, 128)[:len(mode)])
+    options = {}
+    if orientation:
+        exif = Image.Exif()
+        exif[ORIENTATION] = orientation
+        exif[MAKE] = 'Camera'
+        options['exif'] = exif.tobytes()
+    output = BytesIO()
+    image.save(output, image_format, **options)
+    return output.getvalue()
+
+
+class EncodeTests(SimpleTestCase):
+    """Тестирование пережатия картинок"""
+
+    def test_large_photo_is_resized_and_stripped(self):
+        data = make_image((3000, 1500), orientation=1)
+        encoded, image_format, size = images.encode(data, 1024, 80)
+        self.assertEqual(image_format, 'JPEG')
+        self.assertEqual(size, (1024, 512))
+        with Image.open(BytesIO(encoded)) as image:
+            self.assertEqual(image.size, (1024, 512))
+            self.assertNotIn('exif', image.info)
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_exif_rotation_applied(self):
+        data = make_image((300, 100), orientation=6)
+        _, _, size = images.encode(data, 1024, 80)
+        self.assertEqual(size, (100, 300))
+
+    def test_small_image_is_not_upscaled(self):
+        _, _, size = images.encode(make_image((40, 20)), 1024, 80)
+        self.assertEqual(size, (40, 20))
+
+    def test_transparent_image_stays_png(self):
+        data = make_image((300, 300), mode='RGBA', image_format='PNG')
+        encoded, image_format, size = images.encode(data, 100, 80)
+        self.assertEqual((image_format, size), ('PNG', (100, 100)))
+        with Image.open(BytesIO(encoded)) as image:
+            self.assertEqual(image.mode, 'RGBA')
+
+    def test_animation_is_kept(self):
+        frames = [Image.new('P', (20, 20), color) for color in (1, 2)]
+        output = BytesIO()
+        frames[0].save(
+            output, 'GIF', save_all=True, append_images=frames[1:]
+        )
+        encoded, image_format, size = images.encode(
+            output.getvalue(), 10, 80
+        )
+        self.assertIsNone(encoded)
+        self.assertEqual((image_format, size), ('GIF', (20, 20)))
+
+    @override_settings(IMAGE_PROCESS_WORKERS=1)
+    def test_process_pool(self):
+        uploaded = SimpleUploadedFile('photo.png', make_image(
+            (3000, 1000), image_format='PNG'
+        ))
+        try:
+            processed, width, height = images.process(uploaded)
+        finally:
+            images._executor.shutdown()
+        self.assertEqual((processed.name, width, height), (
+            'photo.jpg', settings.IMAGE_MAX_SIZE,
+            round(settings.IMAGE_MAX_SIZE / 3)
+        ))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, IMAGE_MAX_SIZE=500)
+class UploadTests(TestCase):
+    """Тестирование обработки картинки при публикации"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def upload(self, url, name, data):
+        return self.client.post(url, {
+            'text': 'Пост с фотографией',
+            'image': SimpleUploadedFile(name, data, content_type='image/png'),
+        })
+
+    def test_create_stores_processed_image_and_size(self):
+        original = make_image((2000, 1000), image_format='PNG')
+        self.upload(reverse('posts:post_create'), 'photo.png', original)
+        post = Post.objects.get()
+        self.assertEqual((post.image_width, post.image_height), (500, 250))
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertLess(post.image.size, len(original))
+        with Image.open(post.image) as image:
+            self.assertEqual(image.size, (500, 250))
+
+    def test_edit_replaces_size(self):
+        post = Post.objects.create(author=self.author, text='Пост')
+        self.upload(
+            reverse('posts:post_edit', args=[post.pk]),
+            'photo.jpg', make_image((300, 600), orientation=1)
+        )
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (250, 500))
+        self.client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': 'Без картинки', 'image-clear': 'on',
+        })
+        post.refresh_from_db()
+        self.assertFalse(post.image)
+        self.assertIsNone(post.image_width)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ResponsiveThumbnailTests(TestCase):
+    """Тестирование набора миниатюр для srcset"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def test_geometries_do_not_exceed_original(self):
+        self.assertEqual(
+            thumbnails.post_geometries(700),
+            ('360x127', '640x226', '960x339')
+        )
+        self.assertEqual(
+            thumbnails.post_geometries(100), ('960x339',)
+        )
+        self.assertEqual(
+            len(thumbnails.post_geometries()), len(thumbnails.POST_WIDTHS)
+        )
+
+    def test_feed_renders_srcset(self):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фотографией',
+            'image': SimpleUploadedFile(
+                'photo.jpg', make_image((1000, 500)), content_type='image/jpeg'
+            ),
+        })
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'loading="lazy"')
+        self.assertContains(response, 'width="960" height="339"')
+        self.assertContains(response, f'sizes="{thumbnails.POST_SIZES}"')
+        content = response.content.decode()
+        for width in (360, 640, 960):
+            self.assertIn(f' {width}w', content)
+        self.assertNotIn(' 1440w', content)
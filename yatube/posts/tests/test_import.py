@@ -0,0 +1,184 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.counters import get_stats
+from posts.importer import Importer
+from posts.models import FeedItem, Follow, Group, Post
+from posts.search import search_posts
+
+User = get_user_model()
+
+
+class ImportPostsTests(TestCase):
+    """Тестирование импорта постов"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем автора, подписчика и группу"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.records = [
+            {
+                'author': 'author',
+                'text': f'Импортированный пост {number}',
+                'group': 'test-slug',
+                'pub_date': f'2020-01-0{number + 1}T10:00:00+00:00',
+            }
+            for number in range(5)
+        ] + [
+            {'author': 'author', 'text': ''},
+            {'author': 'newcomer', 'text': 'Пост нового автора'},
+        ]
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'posts.jsonl')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for record in self.records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def import_posts(self, *args):
+        call_command(
+            'import_posts', self.path, '--batch-size', '2', *args,
+            stdout=StringIO()
+        )
+
+    def test_import_posts(self):
+        """посты вставляются с датами, лентами, счетчиками и индексом"""
+        self.import_posts()
+        posts = Post.objects.filter(author=self.author)
+        self.assertEqual(posts.count(), 5)
+        self.assertEqual(posts.filter(group=self.group).count(), 5)
+        self.assertEqual(
+            posts.order_by('pub_date').first().pub_date.isoformat(),
+            '2020-01-01T10:00:00+00:00'
+        )
+        self.assertEqual(
+            FeedItem.objects.filter(user=self.reader).count(), 5
+        )
+        self.assertEqual(get_stats(self.author).posts, 5)
+        self.assertEqual(
+            len(search_posts('Импортированный', None, 10)), 5
+        )
+        self.assertFalse(User.objects.filter(username='newcomer').exists())
+
+    def test_import_changes_etags(self):
+        """после импорта страницы группы и автора не отдают 304"""
+        client = Client()
+        urls = [
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]),
+        ]
+        etags = {url: client.get(url)['ETag'] for url in urls}
+        self.import_posts()
+        for url in urls:
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_create_authors(self):
+        """с --create-authors отсутствующие авторы создаются"""
+        self.import_posts('--create-authors')
+        newcomer = User.objects.get(username='newcomer')
+        self.assertEqual(newcomer.posts.count(), 1)
+        self.assertEqual(get_stats(newcomer).posts, 1)
+
+    def test_created_authors_counted(self):
+        """в статистику идут только вставленные авторы"""
+        bulk_create = User.objects.bulk_create
+
+        def racing_bulk_create(*args, **kwargs):
+            # одного из авторов успел создать параллельный импорт
+            User.objects.create(username='racer')
+            return bulk_create(*args, **kwargs)
+
+        importer = Importer(create_authors=True)
+        records = [
+            {'author': 'newcomer', 'text': 'Пост'},
+            {'author': 'racer', 'text': 'Пост'},
+        ]
+        with mock.patch.object(
+            User.objects, 'bulk_create', side_effect=racing_bulk_create
+        ):
+            list(importer.run(records))
+        self.assertEqual(importer.stats['authors'], 1)
+        self.assertEqual(importer.stats['posts'], 2)
+
+    def test_resume_from_checkpoint(self):
+        """с --resume уже импортированные записи пропускаются"""
+        with open(f'{self.path}.checkpoint', 'w') as file:
+            json.dump({'done': 4}, file)
+        self.import_posts('--resume')
+        self.assertEqual(Post.objects.count(), 1)
+        with open(f'{self.path}.checkpoint') as file:
+            self.assertEqual(json.load(file), {'done': len(self.records)})
+
+    def test_csv(self):
+        """записи читаются и из CSV"""
+        path = os.path.join(self.directory, 'posts.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write('author,text,group\nauthor,Пост из CSV,test-slug\n')
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertTrue(Post.objects.filter(text='Пост из CSV').exists())
+
+    def write_image_record(self):
+        with open(os.path.join(self.directory, 'small.gif'), 'wb') as file:
+            file.write(
+                b'\x47\x49\x46\x38\x39\x61\x02\x00'
+                b'\x01\x00\x80\x00\x00\x00\x00\x00'
+                b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+                b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+                b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+                b'\x0A\x00\x3B'
+            )
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write(json.dumps({
+                'author': 'author', 'text': 'С картинкой', 'image': 'small.gif'
+            }) + '\n')
+        return os.path.join(self.directory, 'media')
+
+    def test_images_copied(self):
+        """картинки обрабатываются, копируются в хранилище
+        и ставятся в очередь миниатюр
+        """
+        media = self.write_image_record()
+        with override_settings(MEDIA_ROOT=media), \
+                mock.patch('posts.thumbnails.queue') as queue:
+            self.import_posts('--image-root', self.directory)
+        post = Post.objects.get(text='С картинкой')
+        self.assertEqual(post.image.name, 'posts/small.jpg')
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        self.assertTrue(os.path.exists(os.path.join(media, 'posts/small.jpg')))
+        queue.assert_called_once_with(
+            'posts/small.jpg', thumbnails.post_geometries()
+        )
+
+    def test_images_removed_on_rollback(self):
+        """при откате пачки копии картинок удаляются"""
+        media = self.write_image_record()
+        with override_settings(MEDIA_ROOT=media), \
+                mock.patch('posts.importer.Importer.insert',
+                           side_effect=RuntimeError), \
+                self.assertRaises(RuntimeError):
+            self.import_posts('--image-root', self.directory)
+        self.assertFalse(os.listdir(os.path.join(media, 'posts')))
+        self.assertFalse(Post.objects.filter(text='С картинкой').exists())
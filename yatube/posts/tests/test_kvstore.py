@@ -0,0 +1,98 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models import F
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.kvstores import cached_db_kvstore
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+POSTS = 10
+IMAGE_WIDTH = 400
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailStoreTests(TestCase):
+    """Запросы к хранилищу ключей миниатюр на странице ленты"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        output = BytesIO()
+        Image.new('RGB', (IMAGE_WIDTH, 200), 'red').save(output, 'JPEG')
+        cls.geometries = thumbnails.post_geometries(IMAGE_WIDTH)
+        for number in range(POSTS):
+            name = default_storage.save(
+                f'posts/photo_{number}.jpg', ContentFile(output.getvalue())
+            )
+            Post.objects.create(
+                author=cls.author, text=f'Пост {number}', image=name,
+                image_width=IMAGE_WIDTH, image_height=200,
+            )
+            thumbnails.generate(
+                name, cls.geometries, thumbnails.POST_OPTIONS
+            )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def kvstore_queries(self):
+        """запросы к таблице миниатюр при отрисовке ленты"""
+        with CaptureQueriesContext(connection) as captured:
+            response = Client().get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'srcset=', count=POSTS)
+        return sum(
+            'thumbnail_kvstore' in query['sql']
+            for query in captured.captured_queries
+        )
+
+    def test_cold_cache_needs_one_query_per_page(self):
+        cache.clear()
+        batched = self.kvstore_queries()
+        cache.clear()
+        with mock.patch.object(
+            default, 'kvstore', cached_db_kvstore.KVStore()
+        ):
+            unbatched = self.kvstore_queries()
+        self.assertEqual(batched, 1)
+        self.assertEqual(unbatched, POSTS * len(self.geometries))
+
+    def test_warm_cache_needs_no_queries(self):
+        cache.clear()
+        self.kvstore_queries()
+        # карточки устарели, записи о миниатюрах остались в кэше
+        Post.objects.update(version=F('version') + 1)
+        self.assertEqual(self.kvstore_queries(), 0)
+
+    def test_generated_thumbnail_replaces_cached_absence(self):
+        cache.clear()
+        post = Post.objects.first()
+        store = default.kvstore
+        thumbnail_file = thumbnails.backend.thumbnail_file(
+            post.image, '200x71', **dict(thumbnails.POST_OPTIONS)
+        )
+        store.prefetch([thumbnail_file])
+        self.assertIsNone(store.get(thumbnail_file))
+        thumbnails.generate(
+            post.image.name, '200x71', thumbnails.POST_OPTIONS
+        )
+        self.assertIsNotNone(store.get(thumbnail_file))
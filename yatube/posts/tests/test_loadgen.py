@@ -0,0 +1,140 @@
+import shutil
+import statistics
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Sum
+from django.test import LiveServerTestCase, TestCase, override_settings
+
+from posts import loadgen
+from posts.models import Comment, FeedItem, Group, Post, User, UserStats
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class SeedLoadTests(TestCase):
+    """Тестирование команды seed_load"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_load', users=60, groups=6, posts=120, comments=80,
+            follows_per_user=8, image_share=0.05, stdout=StringIO()
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_objects_created(self):
+        self.assertEqual(User.objects.filter(
+            username__startswith=loadgen.USER_PREFIX
+        ).count(), 60)
+        self.assertEqual(Group.objects.count(), 6)
+        self.assertEqual(Post.objects.count(), 120)
+        self.assertEqual(Comment.objects.count(), 80)
+        self.assertTrue(FeedItem.objects.exists())
+
+    def test_followers_are_skewed(self):
+        """у самых популярных авторов подписчиков намного больше медианы"""
+        followers = list(UserStats.objects.values_list(
+            'followers', flat=True
+        ))
+        self.assertGreater(
+            max(followers), 4 * max(statistics.median(followers), 1)
+        )
+
+    def test_hot_groups(self):
+        counts = sorted(
+            (group.posts.count() for group in Group.objects.all()),
+            reverse=True
+        )
+        self.assertGreater(counts[0], counts[-1])
+
+    def test_counters_match_rows(self):
+        totals = UserStats.objects.aggregate(
+            posts=Sum('posts'), comments=Sum('comments')
+        )
+        self.assertEqual(totals['posts'], 120)
+        self.assertEqual(totals['comments'], 80)
+
+    def test_images_saved(self):
+        posts = Post.objects.exclude(image='')
+        self.assertTrue(posts.exists())
+        for post in posts:
+            self.assertTrue(post.image.storage.exists(post.image.name))
+
+    def test_users_can_log_in(self):
+        user = User.objects.filter(
+            username__startswith=loadgen.USER_PREFIX
+        ).first()
+        self.assertTrue(user.check_password(loadgen.PASSWORD))
+
+
+class SeedFanOutTests(TestCase):
+    """посты популярных авторов не раскладываются по лентам"""
+
+    @override_settings(FEED_FANOUT_LIMIT=3)
+    def test_celebrities_not_fanned_out(self):
+        # повторный запуск: у уже созданных авторов есть счетчики,
+        # а новых подписчиков в них еще нет
+        for random_seed in range(2):
+            last_pk = Post.objects.order_by('-pk').values_list(
+                'pk', flat=True
+            ).first() or 0
+            loadgen.seed(
+                users=15, groups=2, posts=30, comments=0,
+                follows_per_user=3, image_share=0, random_seed=random_seed
+            )
+        celebrities = UserStats.objects.filter(
+            followers__gt=3
+        ).values_list('user_id', flat=True)
+        new_posts = Post.objects.filter(
+            pk__gt=last_pk, author_id__in=celebrities
+        )
+        self.assertTrue(new_posts.exists())
+        self.assertFalse(
+            FeedItem.objects.filter(post__in=new_posts).exists()
+        )
+
+
+class DriveLoadTests(LiveServerTestCase):
+    """Тестирование нагрузки на запущенный сервер"""
+
+    def setUp(self):
+        loadgen.seed(
+            users=10, groups=3, posts=30, comments=20,
+            follows_per_user=3, image_share=0
+        )
+
+    def test_mix_of_reads_and_writes(self):
+        posts_before = Post.objects.count()
+        driver = loadgen.LoadDriver(
+            self.live_server_url, loadgen.Targets(),
+            mix={'index': 1, 'post_detail': 1, 'post_create': 1},
+            concurrency=1, total=30,
+        )
+        report = driver.run()
+        self.assertEqual(report['requests'], 30)
+        self.assertEqual(report['errors'], 0)
+        self.assertEqual(
+            set(report['scenarios']), {'index', 'post_detail', 'post_create'}
+        )
+        for result in report['scenarios'].values():
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+        self.assertEqual(
+            Post.objects.count() - posts_before,
+            report['scenarios']['post_create']['requests']
+        )
+
+    def test_parse_mix(self):
+        self.assertEqual(
+            loadgen.parse_mix('index=3,post_detail=1'),
+            {'index': 3, 'post_detail': 1}
+        )
+        with self.assertRaises(ValueError):
+            loadgen.parse_mix('unknown=1')
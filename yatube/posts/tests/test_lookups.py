@@ -0,0 +1,97 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import lookups
+from posts.models import Group, Post
+
+User = get_user_model()
+
+
+class LookupCacheTests(TestCase):
+    """Тестирование кэша групп и пользователей"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем автора, группу и пост"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Post.objects.create(author=cls.author, group=cls.group, text='Пост')
+
+    def setUp(self):
+        """создаем клиента и чистим кэши"""
+        self.guest_client = Client()
+        cache.clear()
+        lookups.local_cache.clear()
+
+    def lookup_queries(self, url, table):
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        return [
+            query for query in queries.captured_queries
+            if query['sql'].startswith('SELECT')
+            and f'FROM "{table}"' in query['sql']
+        ]
+
+    def test_repeated_lookups_skip_queries(self):
+        """повторные страницы группы и профиля не ищут объект в базе"""
+        pages = {
+            reverse('posts:group_list', args=[self.group.slug]):
+                'posts_group',
+            reverse('posts:profile', args=[self.author.username]):
+                'auth_user',
+        }
+        for url, table in pages.items():
+            with self.subTest(url=url):
+                self.assertTrue(self.lookup_queries(url, table))
+                cache.clear()
+                self.assertFalse(self.lookup_queries(url, table))
+
+    def test_shared_cache_used_after_local_eviction(self):
+        """объект из общего кэша не требует запроса"""
+        lookups.get_group(self.group.slug)
+        lookups.local_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(lookups.get_group(self.group.slug), self.group)
+
+    def test_each_lookup_gets_own_instance(self):
+        """потоки не делят один объект из кэша процесса"""
+        first = lookups.get_user(self.author.username)
+        first.first_name = 'Изменено в другом запросе'
+        with self.assertNumQueries(0):
+            second = lookups.get_user(self.author.username)
+        self.assertIsNot(first, second)
+        self.assertEqual(second, self.author)
+        self.assertEqual(second.first_name, '')
+        self.assertIn('password', second.get_deferred_fields())
+
+    def test_rename_invalidates_cache(self):
+        """после смены slug старый адрес отдает 404"""
+        group = Group.objects.get(pk=self.group.pk)
+        old_slug = group.slug
+        lookups.get_group(old_slug)
+        group.slug = 'new-slug'
+        group.save()
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=[old_slug])
+        )
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(lookups.get_group('new-slug'), group)
+
+    def test_lru_evicts_oldest(self):
+        """при переполнении вытесняется самый давний ключ"""
+        lru = lookups.LRUCache(size=2, ttl=60)
+        lru.set('a', 1)
+        lru.set('b', 2)
+        lru.get('a')
+        lru.set('c', 3)
+        self.assertIsNone(lru.get('b'))
+        self.assertEqual(lru.get('a'), 1)
+        self.assertEqual(lru.get('c'), 3)
@@ -1,7 +1,12 @@
+import os
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..counters import get_stats
+from ..models import Comment, Follow, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -34,3 +39,51 @@ class PostModelTest(TestCase):
                 self.assertEqual(
                     str(field), expected_values
                 )
+
+
+class UserStatsTest(TestCase):
+    """Тестирование счетчиков пользователя"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем пользователей, пост, подписку и комментарий"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.post = Post.objects.create(author=cls.author, text='пост')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        Comment.objects.create(
+            post=cls.post, author=cls.follower, text='комментарий'
+        )
+
+    def check_stats(self, user, **expected):
+        stats = get_stats(user)
+        for field, value in expected.items():
+            with self.subTest(field=field):
+                self.assertEqual(getattr(stats, field), value)
+
+    def test_counters_follow_changes(self):
+        """счетчики меняются при создании и удалении объектов"""
+        self.check_stats(self.author, posts=1, followers=1, following=0)
+        self.check_stats(self.follower, following=1, comments=1)
+        Follow.objects.filter(user=self.follower).delete()
+        self.post.delete()
+        self.check_stats(self.author, posts=0, followers=0)
+        self.check_stats(self.follower, following=0, comments=0)
+
+    def test_rebuild_counters_command(self):
+        """команда rebuild_counters восстанавливает счетчики"""
+        UserStats.objects.update(posts=100, followers=100)
+        call_command('rebuild_counters', stdout=open(os.devnull, 'w'))
+        self.check_stats(self.author, posts=1, followers=1)
+
+    def test_follow_is_unique(self):
+        """повторная подписка на того же автора запрещена"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.follower, author=self.author)
+
+    def test_user_delete_does_not_restore_stats(self):
+        """удаление пользователя не оставляет строку счетчиков"""
+        self.author.delete()
+        self.assertFalse(
+            UserStats.objects.filter(user_id=self.author.pk).exists()
+        )
@@ -0,0 +1,142 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.base import Template
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core.middleware import RequestProfile, profiling
+from posts.models import Group, Post
+from posts.parallel import gather
+
+User = get_user_model()
+
+
+class ProfilingMiddlewareTests(TestCase):
+    """Тестирование профилирования запросов"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем посты в разных группах"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        for number in range(5):
+            group = Group.objects.create(
+                title=f'Группа {number}',
+                slug=f'group-{number}',
+                description='Описание',
+            )
+            Post.objects.create(
+                author=cls.author, group=group, text=f'Пост {number}'
+            )
+
+    def setUp(self):
+        """создаем клиента и чистим кэш"""
+        self.guest_client = Client()
+        cache.clear()
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_sampled_request_has_server_timing_and_log(self):
+        """выбранный запрос получает Server-Timing и пишет лог"""
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            response = self.guest_client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        record = json.loads(logs.records[0].getMessage())
+        self.assertEqual(record['path'], reverse('posts:index'))
+        self.assertEqual(record['status'], 200)
+        self.assertGreater(record['queries'], 0)
+        self.assertGreater(record['template_ms'], 0)
+        self.assertGreater(record['cache_misses'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_cache_hits_are_counted(self):
+        """повторный запрос страницы из кэша считается попаданием"""
+        with self.assertLogs('core.middleware', 'INFO'):
+            self.guest_client.get(reverse('posts:index'))
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.guest_client.get(reverse('posts:index'))
+        record = json.loads(logs.records[0].getMessage())
+        self.assertGreater(record['cache_hits'], 0)
+        self.assertEqual(record['queries'], 0)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_not_sampled_request_is_untouched(self):
+        """невыбранный запрос не получает заголовка"""
+        response = self.guest_client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_django_templates_not_patched(self):
+        """время шаблонов считает бэкенд, классы Django не подменяются"""
+        render = Template.render
+        with self.assertLogs('core.middleware', 'INFO'):
+            self.guest_client.get(reverse('posts:index'))
+        self.assertIs(Template.render, render)
+
+    @override_settings(PROFILING_DUPLICATE_THRESHOLD=3)
+    def test_duplicate_queries(self):
+        """одинаковые запросы сверх порога считаются повторами"""
+        profile = RequestProfile()
+
+        def execute(sql, params, many, context):
+            return None
+
+        for pk in range(3):
+            profile.record_query(
+                execute, 'SELECT * FROM posts_group WHERE id = %s',
+                [pk], False, {}
+            )
+        profile.record_query(
+            execute, 'SELECT * FROM posts_post', [], False, {}
+        )
+        self.assertEqual(profile.query_count, 4)
+        self.assertEqual(
+            profile.duplicates(),
+            {'SELECT * FROM posts_group WHERE id = %s': 3}
+        )
+
+
+class ProfilingPoolTests(TransactionTestCase):
+    """запросы из потоков пула gather попадают в замеры запроса"""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author')
+        Post.objects.create(author=self.author, text='Пост')
+        self.client = Client()
+        self.client.force_login(self.author)
+        cache.clear()
+
+    def profile_queries(self, url):
+        cache.clear()
+        with self.assertLogs('core.middleware', 'INFO') as logs:
+            self.client.get(url)
+        return json.loads(logs.records[0].getMessage())['queries']
+
+    @override_settings(PROFILING_SAMPLE_RATE=1)
+    def test_pool_queries_counted(self):
+        for url in (
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:post_detail', args=[
+                Post.objects.get(author=self.author).pk
+            ]),
+        ):
+            with self.subTest(url=url):
+                # автор и группа после первого запроса в кэше процесса
+                self.profile_queries(url)
+                with self.settings(VIEW_FETCH_WORKERS=0):
+                    sequential = self.profile_queries(url)
+                with self.settings(VIEW_FETCH_WORKERS=2):
+                    pooled = self.profile_queries(url)
+                self.assertEqual(pooled, sequential)
+
+    def test_gather_in_pool_is_profiled(self):
+        profile = RequestProfile()
+        with self.settings(VIEW_FETCH_WORKERS=2), profiling(profile):
+            gather(*(
+                lambda: Post.objects.count() for _ in range(3)
+            ))
+        self.assertEqual(profile.query_count, 3)
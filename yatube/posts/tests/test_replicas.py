@@ -0,0 +1,156 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.urls import resolve, reverse
+
+from core.middleware import ReplicaMiddleware
+from core.routers import ReplicaRouter, primary, read_replica
+from posts.models import FeedItem, Post, UserStats
+
+User = get_user_model()
+
+REPLICA = 'replica'
+
+
+@override_settings(DATABASE_REPLICAS=[REPLICA])
+class ReplicaRoutingTests(TestCase):
+    """ленты читаются с реплики, запись и чтение после нее -- с основной"""
+    databases = {'default', REPLICA}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.mkdtemp()
+        connections.databases[REPLICA] = {
+            'ENGINE': 'core.sqlite3',
+            'NAME': f'{cls.tmp_dir}/replica.sqlite3',
+        }
+        with override_settings(DATABASE_REPLICAS=[REPLICA]):
+            call_command('migrate', database=REPLICA, verbosity=0)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections[REPLICA].close()
+        del connections[REPLICA]
+        del connections.databases[REPLICA]
+        shutil.rmtree(cls.tmp_dir, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.user, text='Пост из основной базы')
+        # реплика отстает: в ней другой пост того же автора
+        User.objects.using(REPLICA).bulk_create([cls.user])
+        UserStats.objects.using(REPLICA).bulk_create(
+            UserStats.objects.filter(user=cls.user)
+        )
+        post = Post(pk=1000, author=cls.user, text='Пост с реплики')
+        Post.objects.using(REPLICA).bulk_create([post])
+        FeedItem.objects.using(REPLICA).bulk_create([FeedItem(
+            user=cls.user, author=cls.user, post=post,
+            pub_date=Post.objects.using(REPLICA).get(pk=1000).pub_date
+        )])
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_feed_uses_replica(self):
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertContains(response, 'Пост с реплики')
+        self.assertNotContains(response, 'Пост из основной базы')
+
+    @override_settings(REPLICA_VIEWS=(
+        'posts:index', 'posts:profile', 'posts:api_index',
+    ))
+    def test_versioned_pages_use_primary(self):
+        """кэш и ETag по версиям не закрепляют данные отстающей реплики"""
+        for url in (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'Пост из основной базы')
+                self.assertNotContains(response, 'Пост с реплики')
+        response = self.client.get(reverse('posts:api_index'))
+        self.assertEqual(
+            [post['text'] for post in response.json()['results']],
+            ['Пост из основной базы'],
+        )
+
+    def test_other_views_use_primary(self):
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'Пост'}
+        )
+        self.assertContains(response, 'Пост из основной базы')
+
+    def test_reads_after_post_stick_to_primary(self):
+        response = self.client.post(
+            reverse('posts:post_create'), {'text': 'Новый пост'}
+        )
+        self.assertIn(settings.REPLICA_STICKY_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, 'Пост с реплики')
+
+    def test_without_replicas_reads_primary(self):
+        with self.settings(DATABASE_REPLICAS=[]):
+            response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Пост из основной базы')
+
+    def test_read_own_writes_keeps_fast_delete(self):
+        """записи ленты по-прежнему удаляются одним запросом"""
+        post = Post.objects.get(text='Пост из основной базы')
+        FeedItem.objects.create(
+            user=self.user, author=self.user, post=post,
+            pub_date=post.pub_date
+        )
+        with self.assertNumQueries(1):
+            FeedItem.objects.filter(user=self.user).delete()
+
+    def test_router(self):
+        router = ReplicaRouter()
+        token = read_replica.set(REPLICA)
+        try:
+            self.assertEqual(router.db_for_read(User), 'default')
+            self.assertEqual(router.db_for_read(Post), REPLICA)
+            self.assertEqual(router.db_for_write(Post), 'default')
+            self.assertEqual(read_replica.get(), REPLICA)
+            with primary():
+                self.assertEqual(router.db_for_read(Post), 'default')
+            self.assertEqual(router.db_for_read(Post), REPLICA)
+            self.user.save()
+            self.assertEqual(router.db_for_read(Post), 'default')
+        finally:
+            read_replica.reset(token)
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2', 'replica3'])
+    def test_one_replica_per_request(self):
+        """все чтения запроса идут с одной реплики"""
+        router = ReplicaRouter()
+
+        def view(request):
+            return HttpResponse(
+                ','.join({router.db_for_read(Post) for _ in range(20)})
+            )
+
+        url = reverse('posts:follow_index')
+        for _ in range(10):
+            request = RequestFactory().get(url)
+            request.resolver_match = resolve(url)
+            middleware = ReplicaMiddleware(view)
+            middleware.process_view(request, view, (), {})
+            response = middleware(request)
+            self.assertIn(
+                response.content.decode(), settings.DATABASE_REPLICAS
+            )
+        self.assertIsNone(read_replica.get())
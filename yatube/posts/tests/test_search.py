@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts import search
+from posts.search import fts_enabled
+from posts.utils import COUNT_OF_POSTS
+
+User = get_user_model()
+
+
+class SearchViewTests(TestCase):
+    """Тестирование поиска по постам"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем посты с разным числом совпадений"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.rare_post = Post.objects.create(
+            author=cls.author,
+            text='Кошки гуляют сами по себе, а собаки нет',
+        )
+        cls.frequent_post = Post.objects.create(
+            author=cls.author,
+            text='Кошки, кошки и еще раз кошки',
+        )
+        cls.other_post = Post.objects.create(
+            author=cls.author,
+            text='Про погоду',
+        )
+        cls.search = 'posts:search'
+        cls.page_obj = 'page_obj'
+
+    def setUp(self):
+        """создаем клиента"""
+        self.guest_client = Client()
+
+    def find(self, query, **params):
+        response = self.guest_client.get(
+            reverse(self.search), {'q': query, **params}
+        )
+        return response.context[self.page_obj]
+
+    def test_search_finds_matching_posts(self):
+        """поиск находит посты по словам и их началу"""
+        self.assertEqual(
+            set(self.find('кош')),
+            {self.rare_post, self.frequent_post}
+        )
+        self.assertEqual(list(self.find('кошки собаки')), [self.rare_post])
+        self.assertEqual(len(self.find('')), 0)
+
+    def test_search_ranks_by_relevance(self):
+        """пост с большим числом совпадений выше в выдаче"""
+        if not fts_enabled():
+            self.skipTest('SQLite без FTS5')
+        self.assertEqual(self.find('кошки')[0], self.frequent_post)
+
+    def test_search_index_follows_changes(self):
+        """индекс обновляется при изменении и удалении постов"""
+        self.other_post.text = 'Про кошек и погоду'
+        self.other_post.save()
+        self.assertIn(self.other_post, self.find('кошек'))
+        self.other_post.delete()
+        self.assertEqual(len(self.find('погоду')), 0)
+
+    def test_search_pages(self):
+        """выдача делится на страницы по курсору"""
+        for number in range(COUNT_OF_POSTS):
+            Post.objects.create(author=self.author, text=f'Кошки {number}')
+        first_page = self.find('кошки')
+        self.assertEqual(len(first_page), COUNT_OF_POSTS)
+        second_page = self.find('кошки', cursor=first_page.next_cursor)
+        self.assertEqual(len(second_page), 2)
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(set(first_page) & set(second_page))
+
+    def test_search_ranks_only_newest_matches(self):
+        """ранжируются лишь MAX_RANKED самых новых совпадений"""
+        if not fts_enabled():
+            self.skipTest('SQLite без FTS5')
+        newest = Post.objects.create(author=self.author, text='Кошки')
+        with mock.patch.object(search, 'MAX_RANKED', 2):
+            found = list(self.find('кошки'))
+        self.assertEqual(set(found), {newest, self.frequent_post})
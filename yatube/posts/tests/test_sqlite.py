@@ -0,0 +1,141 @@
+import os
+import shutil
+import tempfile
+import threading
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.test import Client, SimpleTestCase
+from django.urls import reverse
+
+from core.sqlite3.base import DatabaseWrapper
+from posts.models import Comment, Post
+
+User = get_user_model()
+
+THREADS = 8
+REQUESTS_PER_THREAD = 10
+
+
+class SQLiteTuningTests(SimpleTestCase):
+    """WAL, busy_timeout и BEGIN IMMEDIATE на файловой базе"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp_dir, ignore_errors=True)
+        self.settings_dict = {
+            **connections.databases['default'],
+            'NAME': os.path.join(self.tmp_dir, 'stress.sqlite3'),
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {'pragmas': {'busy_timeout': 10000}},
+        }
+
+    def connect(self):
+        wrapper = DatabaseWrapper(self.settings_dict)
+        wrapper.ensure_connection()
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_applied_on_connect(self):
+        wrapper = self.connect()
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'busy_timeout'), 10000)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -64 * 1024)
+        # внешние ключи включает сам Django
+        self.assertEqual(self.pragma(wrapper, 'foreign_keys'), 1)
+
+    @staticmethod
+    def in_thread(func):
+        """Выполняет func в новом потоке: его соединение с default
+        создается заново, по текущим настройкам.
+        """
+        result = []
+
+        def run():
+            try:
+                result.append(func())
+            finally:
+                connections.close_all()
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return result[0]
+
+    def use_file_database(self):
+        """default в новых потоках -- файловая база с миграциями"""
+        default = connections.databases['default']
+        connections.databases['default'] = self.settings_dict
+        self.addCleanup(
+            connections.databases.__setitem__, 'default', default
+        )
+        self.in_thread(lambda: call_command('migrate', verbosity=0))
+
+    def test_concurrent_requests_have_no_lock_errors(self):
+        """Одновременные комментарии и посты через views.
+        Запрос читает и пишет в нескольких транзакциях (счетчики,
+        ленты, поисковый индекс); с отложенным BEGIN такие транзакции
+        взаимно блокируются и запрос падает с "database is locked".
+        """
+        self.use_file_database()
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+        def create_users():
+            users = [
+                User.objects.create_user(f'writer_{number}')
+                for number in range(THREADS)
+            ]
+            post = Post.objects.create(
+                author=users[0], text='Пост для комментариев'
+            )
+            return users, post
+
+        users, post = self.in_thread(create_users)
+        errors = []
+        barrier = threading.Barrier(THREADS)
+
+        def worker(user):
+            client = Client()
+            try:
+                client.force_login(user)
+                barrier.wait()
+                for number in range(REQUESTS_PER_THREAD):
+                    if number % 2:
+                        response = client.post(
+                            reverse('posts:add_comment', args=[post.pk]),
+                            {'text': 'Комментарий'}
+                        )
+                    else:
+                        response = client.post(
+                            reverse('posts:post_create'), {'text': 'Пост'}
+                        )
+                    if response.status_code != 302:
+                        errors.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [
+            threading.Thread(target=worker, args=[user]) for user in users
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        half = THREADS * REQUESTS_PER_THREAD // 2
+        self.assertEqual(self.in_thread(lambda: (
+            Comment.objects.filter(post=post).count(),
+            Post.objects.filter(text='Пост').count(),
+        )), (half, half))
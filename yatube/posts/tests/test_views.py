@@ -1,10 +1,21 @@
+from unittest import mock
+
 from django import forms
 from django.contrib.auth import get_user_model
 from django.core.cache import cache
-from django.test import Client, TestCase
+from django.db import connection
+from django.core.paginator import Paginator
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
 
-from posts.models import Follow, Group, Post
+from posts import fragments
+from posts.feed import feed_posts
+from posts.models import Comment, FeedItem, Follow, Group, Post
+from posts.utils import (COUNT_OF_COMMENTS, COUNT_OF_POSTS, CURSOR_PARAM,
+                         KnownCountPaginator, page_window)
 from posts.tests.help_func import check_labels, group_field_check
 
 User = get_user_model()
@@ -153,6 +164,160 @@ class PostsViewsTests(TestCase):
                 self.assertEqual(count_of_posts, self.COUNT_OF_POSTS)
 
 
+class IndexCacheTests(TestCase):
+    """тестирование кэша главной страницы"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем тестовую запись"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.post = Post.objects.create(
+            author=cls.author,
+            text='Тестовый пост',
+        )
+        cls.index = 'posts:index'
+
+    def setUp(self):
+        """очищаем кэш"""
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_index_served_from_cache(self):
+        """повторный запрос главной страницы отдается из кэша"""
+        self.guest_client.get(reverse(self.index))
+        response = self.guest_client.get(reverse(self.index))
+        self.assertIsNone(response.context)
+        self.assertContains(response, self.post.text)
+
+    def test_index_cache_invalidated_on_change(self):
+        """новый и удаленный посты сразу видны на главной странице"""
+        self.guest_client.get(reverse(self.index))
+        new_post = Post.objects.create(author=self.author, text='Новый пост')
+        response = self.guest_client.get(reverse(self.index))
+        self.assertContains(response, new_post.text)
+        new_post.delete()
+        response = self.guest_client.get(reverse(self.index))
+        self.assertNotContains(response, new_post.text)
+
+
+class PostCardCacheTests(TestCase):
+    """тестирование кэша карточек постов"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем группу и посты в ней"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for number in range(3):
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {number}'
+            )
+        cls.group_list = reverse('posts:group_list', args=[cls.group.slug])
+
+    def setUp(self):
+        """очищаем кэш"""
+        cache.clear()
+        self.guest_client = Client()
+
+    def rendered_cards(self):
+        """число карточек, отрисованных заново при запросе группы"""
+        with mock.patch(
+            'posts.fragments.render_to_string',
+            wraps=fragments.render_to_string
+        ) as render:
+            self.guest_client.get(self.group_list)
+        return render.call_count
+
+    def test_only_changed_cards_rendered(self):
+        """заново отрисовывается только измененная карточка"""
+        self.assertEqual(self.rendered_cards(), 3)
+        post = Post.objects.filter(group=self.group).first()
+        post.text = 'Исправленный пост'
+        post.save()
+        self.assertEqual(self.rendered_cards(), 1)
+        response = self.guest_client.get(self.group_list)
+        self.assertContains(response, 'Исправленный пост')
+
+    def test_concurrent_edits_get_distinct_versions(self):
+        """две правки одного поста с устаревшей версией
+            получают разные версии
+        """
+        post = Post.objects.filter(group=self.group).first()
+        first = Post.objects.get(pk=post.pk)
+        second = Post.objects.get(pk=post.pk)
+        first.text = 'Первая правка'
+        first.save()
+        second.text = 'Вторая правка'
+        second.save()
+        self.assertEqual(
+            (first.version, second.version),
+            (post.version + 1, post.version + 2)
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.version, second.version)
+
+    def test_group_change_bumps_versions(self):
+        """изменение группы обновляет карточки ее постов"""
+        self.rendered_cards()
+        self.group.title = 'Новое название'
+        self.group.save()
+        self.assertEqual(self.rendered_cards(), 3)
+
+
+class PostDetailQueriesTest(TestCase):
+    """тестирование запросов страницы поста"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем пост с одним комментарием и пост с многими"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.quiet_post = Post.objects.create(
+            author=cls.author, text='Тихий пост', group=cls.group
+        )
+        cls.hot_post = Post.objects.create(
+            author=cls.author, text='Популярный пост', group=cls.group
+        )
+        Comment.objects.create(
+            post=cls.quiet_post, author=cls.author, text='комментарий'
+        )
+        for number in range(COUNT_OF_COMMENTS + 5):
+            Comment.objects.create(
+                post=cls.hot_post,
+                author=User.objects.create_user(username=f'user_{number}'),
+                text=f'комментарий {number}',
+            )
+        cls.post_detail = 'posts:post_detail'
+
+    def setUp(self):
+        """создаем клиента"""
+        self.guest_client = Client()
+
+    def count_queries(self, post):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.guest_client.get(
+                reverse(self.post_detail, args=[post.id])
+            )
+        return response, len(queries)
+
+    def test_post_detail_queries_do_not_grow_with_comments(self):
+        """число запросов не зависит от числа комментариев"""
+        _, quiet_queries = self.count_queries(self.quiet_post)
+        response, hot_queries = self.count_queries(self.hot_post)
+        self.assertEqual(hot_queries, quiet_queries)
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COUNT_OF_COMMENTS)
+        self.assertTrue(comments.has_next())
+
+
 class PaginatorViewsTest(TestCase):
     """Тестирование паджинатора.
         Создаем тестовые публикации,
@@ -197,13 +362,19 @@ class PaginatorViewsTest(TestCase):
             cls.group_list,
             cls.profile
         ]
+        cls.cursor_pages_requests = [
+            cls.index,
+            cls.group_list,
+        ]
         cls.COUNT_OF_POSTS = 10
+        cls.COUNT_OF_POSTS_SECOND_PAGE = 3
         cls.page_object = 'page_obj'
 
     def setUp(self):
         """присваиваем пользователям объект клиента,
             авторизовываем пользователя и автора
         """
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(self.user)
@@ -222,6 +393,84 @@ class PaginatorViewsTest(TestCase):
                     self.COUNT_OF_POSTS
                 )
 
+    def test_cursor_pages(self):
+        """проверка: курсоры ведут на следующую и предыдущую страницы"""
+        for url, args in self.cursor_pages_requests:
+            with self.subTest(url=url):
+                first_page = self.authorized_author.get(
+                    reverse(url, args=args)
+                ).context[self.page_object]
+                self.assertFalse(first_page.has_previous())
+                second_page = self.authorized_author.get(
+                    reverse(url, args=args),
+                    {'cursor': first_page.next_cursor}
+                ).context[self.page_object]
+                self.assertEqual(
+                    len(second_page), self.COUNT_OF_POSTS_SECOND_PAGE
+                )
+                self.assertFalse(second_page.has_next())
+                self.assertEqual(second_page[-1], self.post)
+                previous_page = self.authorized_author.get(
+                    reverse(url, args=args),
+                    {'cursor': second_page.previous_cursor}
+                ).context[self.page_object]
+                self.assertEqual(list(previous_page), list(first_page))
+
+    def test_broken_cursor_returns_first_page(self):
+        """проверка: битый курсор отдает первую страницу"""
+        url, args = self.group_list
+        response = self.authorized_author.get(
+            reverse(url, args=args), {'cursor': 'broken'}
+        )
+        self.assertEqual(
+            len(response.context[self.page_object]),
+            self.COUNT_OF_POSTS
+        )
+
+    def test_page_window(self):
+        """проверка: ссылки только на крайние и соседние страницы"""
+        pages = Paginator(range(500), self.COUNT_OF_POSTS)
+        cases = {
+            1: [1, 2, 3, None, 50],
+            25: [1, None, 23, 24, 25, 26, 27, None, 50],
+            49: [1, None, 47, 48, 49, 50],
+        }
+        for number, window in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(page_window(pages.page(number)), window)
+
+    def test_profile_pages_counted_from_stats(self):
+        """проверка: число страниц профиля берется из счетчиков"""
+        url, args = self.profile
+        page = self.authorized_client.get(
+            reverse(url, args=args), {'page': 2}
+        ).context[self.page_object]
+        self.assertIsInstance(page.paginator, KnownCountPaginator)
+        self.assertEqual(
+            page.paginator.count,
+            Post.objects.filter(author=self.author).count()
+        )
+        self.assertEqual(len(page), self.COUNT_OF_POSTS_SECOND_PAGE)
+
+    def test_follow_pages_without_count(self):
+        """проверка: лента подписок листается без COUNT(*)"""
+        Follow.objects.create(user=self.user, author=self.author)
+        url = reverse('posts:follow_index')
+        with CaptureQueriesContext(connection) as queries:
+            first_page = self.authorized_client.get(url).context[
+                self.page_object
+            ]
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] for query in queries.captured_queries
+        ))
+        self.assertTrue(first_page.has_next())
+        second_page = self.authorized_client.get(
+            url, {CURSOR_PARAM: first_page.next_cursor}
+        ).context[self.page_object]
+        self.assertEqual(len(second_page), self.COUNT_OF_POSTS_SECOND_PAGE)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+
 
 class FollowTests(TestCase):
     """тестирование подписок"""
@@ -285,3 +534,208 @@ class FollowTests(TestCase):
         url, args = self.profile_unfollow
         self.client_auth_follower.get(reverse(url, args=args))
         self.assertEqual(Follow.objects.count(), count_of_follow - 1)
+
+    def test_unfollow_prunes_feed(self):
+        """после отписки посты автора пропадают из ленты"""
+        url, args = self.profile_unfollow
+        self.client_auth_follower.get(reverse(url, args=args))
+        response = self.client_auth_follower.get(reverse(self.follow_index))
+        self.assertEqual(len(response.context[self.page_obj]), 0)
+        self.assertFalse(
+            FeedItem.objects.filter(user=self.user_follower).exists()
+        )
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_celebrity_posts_read_on_request(self):
+        """посты популярного автора не раздаются по лентам,
+            а подмешиваются при чтении
+        """
+        post = Post.objects.create(
+            text='Пост популярного автора',
+            author=self.author_1
+        )
+        self.assertFalse(FeedItem.objects.filter(post=post).exists())
+        response = self.client_auth_follower.get(reverse(self.follow_index))
+        self.assertEqual(response.context[self.page_obj][0], post)
+
+    def test_feed_page_reads_index_in_order(self):
+        """страница ленты -- проход по индексу без сортировки"""
+        posts, keys = feed_posts(self.user_follower)
+        page = posts.filter(
+            **{f'{keys[0]}__lt': timezone.now()}
+        ).order_by(*(f'-{key}' for key in keys))[:COUNT_OF_POSTS]
+        sql, params = page.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(str(row) for row in cursor.fetchall())
+        self.assertIn('feed_user_pub_date_post_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_same_pub_date_pages_do_not_overlap(self):
+        """посты с одинаковой датой не повторяются и не теряются
+            при переходе между страницами ленты
+        """
+        for number in range(COUNT_OF_POSTS + 2):
+            Post.objects.create(text=f'Пост {number}', author=self.author_1)
+        pub_date = timezone.now()
+        Post.objects.update(pub_date=pub_date)
+        FeedItem.objects.update(pub_date=pub_date)
+        seen = []
+        cursor = None
+        for _ in range(2):
+            response = self.client_auth_follower.get(
+                reverse(self.follow_index), {CURSOR_PARAM: cursor or ''}
+            )
+            page = response.context[self.page_obj]
+            seen += [post.pk for post in page]
+            cursor = page.next_cursor
+        self.assertCountEqual(
+            seen, Post.objects.values_list('pk', flat=True)
+        )
+
+
+@override_settings(FEED_FANOUT_LIMIT=1, FEED_BACKFILL_WORKERS=0)
+class FormerCelebrityTests(TransactionTestCase):
+    """автор, переставший быть популярным, попадает в ленты"""
+
+    def test_unfollow_below_limit_backfills_feeds(self):
+        author = User.objects.create_user(username='author')
+        early = User.objects.create_user(username='early')
+        late = User.objects.create_user(username='late')
+        old_post = Post.objects.create(text='Старый пост', author=author)
+        Follow.objects.create(user=early, author=author)
+        Follow.objects.create(user=late, author=author)
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        self.assertFalse(FeedItem.objects.filter(user=late).exists())
+        Follow.objects.filter(user=early).delete()
+        self.assertCountEqual(
+            FeedItem.objects.filter(user=late).values_list(
+                'post_id', flat=True
+            ),
+            [old_post.pk, new_post.pk]
+        )
+
+    @override_settings(FEED_BACKFILL_POSTS=1)
+    def test_backfill_only_recent_posts(self):
+        author = User.objects.create_user(username='author')
+        early = User.objects.create_user(username='early')
+        late = User.objects.create_user(username='late')
+        Post.objects.create(text='Старый пост', author=author)
+        Follow.objects.create(user=early, author=author)
+        Follow.objects.create(user=late, author=author)
+        new_post = Post.objects.create(text='Новый пост', author=author)
+        Follow.objects.filter(user=early).delete()
+        self.assertEqual(
+            list(FeedItem.objects.filter(user=late).values_list(
+                'post_id', flat=True
+            )),
+            [new_post.pk]
+        )
+
+
+class ConditionalGetTests(TestCase):
+    """тестирование условного GET страниц постов"""
+    @classmethod
+    def setUpClass(cls):
+        """создаем пост в группе"""
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='Тестовый пост'
+        )
+        cls.urls = [
+            reverse('posts:post_detail', args=[cls.post.pk]),
+            reverse('posts:profile', args=[cls.author.username]),
+            reverse('posts:group_list', args=[cls.group.slug]),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_unchanged_pages_not_modified(self):
+        """неизменная страница отдает 304 по ETag и по дате"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                etag = response['ETag']
+                last_modified = response['Last-Modified']
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                response = self.guest_client.get(
+                    url, HTTP_IF_MODIFIED_SINCE=last_modified
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """комментарий, новый и удаленный посты меняют ETag"""
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        post_url = self.urls[0]
+        response = self.guest_client.get(
+            post_url, HTTP_IF_NONE_MATCH=etags[post_url]
+        )
+        self.assertEqual(response.status_code, 200)
+        new_post = Post.objects.create(
+            author=self.author, group=self.group, text='Новый пост'
+        )
+        etags = {url: self.guest_client.get(url)['ETag'] for url in self.urls}
+        new_post.delete()
+        for url in self.urls[1:]:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_validators_do_not_scan_posts(self):
+        """ETag профиля и группы считается без запросов к постам"""
+        for url in self.urls[1:]:
+            with self.subTest(url=url):
+                etag = self.guest_client.get(url)['ETag']
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag
+                    )
+                self.assertEqual(response.status_code, 304)
+                self.assertFalse(any(
+                    'posts_post' in query['sql']
+                    for query in queries.captured_queries
+                ))
+
+    def test_moved_post_changes_both_groups(self):
+        """пост, перенесенный в другую группу, меняет страницы обеих"""
+        other = Group.objects.create(title='Другая', slug='other')
+        urls = [self.urls[2], reverse('posts:group_list', args=[other.slug])]
+        etags = [self.guest_client.get(url)['ETag'] for url in urls]
+        post = Post.objects.get(pk=self.post.pk)
+        post.group = other
+        post.save()
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_author_name_changes_profile(self):
+        """новое имя автора меняет его страницу, вход -- нет"""
+        url = self.urls[1]
+        etag = self.guest_client.get(url)['ETag']
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=['last_login'])
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.author.first_name = 'Лев'
+        self.author.save()
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
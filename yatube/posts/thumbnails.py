@@ -0,0 +1,159 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend as BaseThumbnailBackend
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile
+
+from core.executors import LazyExecutor
+
+from . import caching, fragments
+
+logger = logging.getLogger(__name__)
+
+POST_GEOMETRY: str = '960x339'
+POST_OPTIONS = {'crop': 'center', 'upscale': True}
+# ширины миниатюр для srcset, пропорции те же, что у POST_GEOMETRY
+POST_WIDTHS = (360, 640, 960, 1440)
+# ширина картинки на странице: колонка контейнера или весь экран
+POST_SIZES: str = '(min-width: 1200px) 960px, (min-width: 768px) 720px, 100vw'
+
+
+class ThumbnailBackend(BaseThumbnailBackend):
+    """Бэкенд sorl-thumbnail, который умеет искать готовую
+    миниатюру, не создавая ее.
+    """
+
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """файл миниатюры, как его назовет get_thumbnail"""
+        source = ImageFile(file_)
+        if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(thumbnail_settings, attr)
+            if value != getattr(default_settings, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+    def lookup(self, file_, geometry_string, **options):
+        """готовая миниатюра из хранилища ключей или None"""
+        return default.kvstore.get(
+            self.thumbnail_file(file_, geometry_string, **options)
+        )
+
+
+backend = ThumbnailBackend()
+
+_executor = LazyExecutor(lambda: ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS, thread_name_prefix='thumbnails'
+))
+_pending = set()
+_lock = threading.Lock()
+
+
+def post_geometry(width):
+    """геометрия миниатюры поста заданной ширины"""
+    base_width, base_height = map(int, POST_GEOMETRY.split('x'))
+    return f'{width}x{round(width * base_height / base_width)}'
+
+
+def post_geometries(image_width=None):
+    """Геометрии набора миниатюр картинки.
+    Ширины больше исходной не нужны, кроме основной POST_GEOMETRY:
+    она остается запасным src для браузеров без srcset.
+    """
+    widths = {
+        width for width in POST_WIDTHS
+        if not image_width or width <= image_width
+    }
+    widths.add(int(POST_GEOMETRY.split('x')[0]))
+    return tuple(post_geometry(width) for width in sorted(widths))
+
+
+def generate(name, geometry=POST_GEOMETRY, options=POST_OPTIONS):
+    """Создает миниатюру картинки или набор миниатюр, если geometry --
+    кортеж. Ошибки только пишет в лог.
+    """
+    geometries = (geometry,) if isinstance(geometry, str) else geometry
+    try:
+        for size in geometries:
+            backend.get_thumbnail(name, size, **options)
+        # карточки и страницы с заглушкой вместо картинки устарели
+        fragments.bump_versions(image=name)
+        caching.bump_version(caching.POSTS)
+    except Exception:
+        logger.exception('Не удалось создать миниатюру %s', name)
+    finally:
+        with _lock:
+            _pending.discard((name, geometry))
+
+
+def _generate_in_pool(name, geometry, options):
+    """generate в потоке пула: соединение с базой у потока свое"""
+    try:
+        generate(name, geometry, options)
+    finally:
+        close_old_connections()
+
+
+def _submit(name, geometry, options):
+    """отдает задачу пулу, если такая же еще не ждет в нем"""
+    with _lock:
+        if (name, geometry) in _pending:
+            return
+        _pending.add((name, geometry))
+    _executor.submit(_generate_in_pool, name, geometry, options)
+
+
+def queue(name, geometry=POST_GEOMETRY, options=POST_OPTIONS):
+    """Ставит создание миниатюры (или набора, см. generate)
+    в очередь фоновых потоков после коммита: при откате задача
+    не ставится и не остается в _pending.
+    При THUMBNAIL_WORKERS = 0 миниатюра создается сразу.
+    """
+    options = dict(options)
+    if not settings.THUMBNAIL_WORKERS:
+        generate(name, geometry, options)
+        return
+    with _lock:
+        if (name, geometry) in _pending:
+            return
+    transaction.on_commit(lambda: _submit(name, geometry, options))
+
+
+def get_ready_set(image, image_width=None):
+    """Готовые миниатюры набора: список пар (ширина, миниатюра).
+    Если готовы не все, весь набор ставится в очередь одной задачей.
+    """
+    if not image:
+        return []
+    geometries = post_geometries(image_width)
+    ready = []
+    for geometry in geometries:
+        thumbnail = backend.lookup(image, geometry, **dict(POST_OPTIONS))
+        if thumbnail is not None:
+            ready.append((int(geometry.split('x')[0]), thumbnail))
+    if len(ready) < len(geometries):
+        queue(image.name, geometries, POST_OPTIONS)
+    return ready
+
+
+def prefetch(posts):
+    """Загружает записи о миниатюрах всех картинок постов разом,
+    если хранилище ключей это умеет (posts.kvstore.KVStore).
+    """
+    if not hasattr(default.kvstore, 'prefetch'):
+        return
+    default.kvstore.prefetch([
+        backend.thumbnail_file(post.image, geometry, **dict(POST_OPTIONS))
+        for post in posts if post.image
+        for geometry in post_geometries(post.image_width)
+    ])
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = 'posts'
 
@@ -16,6 +16,7 @@ urlpatterns = [
         views.add_comment,
         name='add_comment'
     ),
+    path('search/', views.search, name='search'),
     path('follow/', views.follow_index, name='follow_index'),
     path(
         'profile/<str:username>/follow/',
@@ -27,5 +28,14 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path('api/posts/', api.index, name='api_index'),
+    path('api/group/<slug:slug>/', api.group_posts, name='api_group_list'),
+    path('api/profile/<str:username>/', api.profile, name='api_profile'),
+    path(
+        'api/posts/<int:post_id>/',
+        api.post_detail,
+        name='api_post_detail'
+    ),
+    path('api/follow/', api.follow_index, name='api_follow_index'),
 
 ]
@@ -1,11 +1,205 @@
-from django.core.paginator import Paginator
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
 
 
 COUNT_OF_POSTS: int = 10
+COUNT_OF_COMMENTS: int = 20
+CURSOR_PARAM: str = 'cursor'
+PAGES_ON_EACH_SIDE: int = 2
+
+
+class UncountedPaginator(Paginator):
+    """Постраничное деление без COUNT(*).
+    Берет на одну запись больше страницы, чтобы узнать, есть ли
+    следующая; общее число страниц неизвестно.
+    """
+    is_counted = False
+
+    def get_page(self, number):
+        try:
+            number = max(int(number), 1)
+        except (TypeError, ValueError):
+            number = 1
+        bottom = (number - 1) * self.per_page
+        items = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not items and number > 1:
+            return self.get_page(1)
+        self.num_pages = number + 1 if len(items) > self.per_page else number
+        return self._get_page(items[:self.per_page], number, self)
+
+
+class KnownCountPaginator(Paginator):
+    """Постраничное деление с заранее известным числом записей,
+    например из счетчиков пользователя: COUNT(*) не выполняется.
+    """
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self.count = count
 
 
-def paginator(queryset, request):
-    """функция для постраничного деления контента"""
-    paginator = Paginator(queryset, COUNT_OF_POSTS)
+def paginator(queryset, request, count=True):
+    """функция для постраничного деления контента,
+    при count=False -- без подсчета общего числа записей,
+    при числе в count -- с ним вместо подсчета
+    """
+    if count is True:
+        paginator = Paginator(queryset, COUNT_OF_POSTS)
+    elif count is False:
+        paginator = UncountedPaginator(queryset, COUNT_OF_POSTS)
+    else:
+        paginator = KnownCountPaginator(queryset, COUNT_OF_POSTS, count)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def page_window(page, on_each_side=PAGES_ON_EACH_SIDE):
+    """Номера страниц для ссылок: первая, последняя и соседние
+    с текущей. Пропуски между ними обозначены None.
+    """
+    last = page.paginator.num_pages
+    numbers = sorted({1, last} | set(range(
+        max(page.number - on_each_side, 1),
+        min(page.number + on_each_side, last) + 1
+    )))
+    window = []
+    for number in numbers:
+        if window and number - window[-1] > 1:
+            window.append(None)
+        window.append(number)
+    return window
+
+
+def encode_cursor(direction, value, pk):
+    """упаковывает позицию (value, pk) и направление в строку курсора"""
+    raw = f'{direction}{value.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """распаковывает курсор, для битого курсора возвращает None"""
+    if not cursor:
+        return None
+    try:
+        padding = '=' * (-len(cursor) % 4)
+        raw = base64.urlsafe_b64decode(cursor + padding).decode()
+        value, pk = raw[1:].rsplit('|', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if raw[0] not in 'np' or value is None:
+        return None
+    return raw[0], value, pk
+
+
+class CursorPage(Page):
+    """Страница курсорной пагинации.
+    Вместо номеров страниц хранит курсоры соседних страниц.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        super().__init__(object_list, None, paginator)
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+
+class CursorPaginator(Paginator):
+    """Постраничное деление по ключу (field, pk).
+    Следующая страница выбирается условием по последней
+    записи текущей, поэтому не нужны ни COUNT(*), ни OFFSET.
+    Работает и с queryset.values(), если в них есть field и id.
+    keys -- поля для условия и сортировки, если они не (field, pk),
+    а равные им столбцы другой таблицы (например, записи ленты).
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date', keys=None):
+        super().__init__(object_list, per_page)
+        self.field = field
+        self.keys = keys or (field, 'pk')
+
+    def _position(self, obj):
+        if isinstance(obj, dict):
+            return obj[self.field], obj['id']
+        return getattr(obj, self.field), obj.pk
+
+    def get_page(self, cursor):
+        """возвращает страницу по курсору,
+        для пустого или битого курсора -- первую
+        """
+        position = decode_cursor(cursor)
+        queryset = self.object_list
+        key, pk_key = self.keys
+        if position is None:
+            direction = 'n'
+        else:
+            direction, value, pk = position
+            lookup = 'lt' if direction == 'n' else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{key}__{lookup}': value})
+                | Q(**{key: value, f'{pk_key}__{lookup}': pk})
+            )
+        if direction == 'n':
+            queryset = queryset.order_by(f'-{key}', f'-{pk_key}')
+        else:
+            queryset = queryset.order_by(key, pk_key)
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if not items:
+            if position is not None:
+                return self.get_page(None)
+            return CursorPage(items, self)
+        if direction == 'p':
+            items.reverse()
+        first, last = items[0], items[-1]
+        has_next = has_more if direction == 'n' else True
+        has_previous = position is not None if direction == 'n' else has_more
+        return CursorPage(
+            items,
+            self,
+            next_cursor=(
+                encode_cursor('n', *self._position(last))
+                if has_next else None
+            ),
+            previous_cursor=(
+                encode_cursor('p', *self._position(first))
+                if has_previous else None
+            ),
+        )
+
+
+def cursor_paginator(queryset, request, field='pub_date',
+                     per_page=COUNT_OF_POSTS, keys=None):
+    """функция для постраничного деления контента по курсору"""
+    paginator = CursorPaginator(queryset, per_page, field=field, keys=keys)
+    return paginator.get_page(request.GET.get(CURSOR_PARAM))
+
+
+def as_plain_page(page):
+    """Курсорная страница в виде обычного Page, там, где нужен
+    именно он. Соседние страницы задаются номером и числом страниц,
+    как в UncountedPaginator, курсоры остаются атрибутами.
+    """
+    number = 2 if page.has_previous() else 1
+    page.paginator.num_pages = number + 1 if page.has_next() else number
+    plain = Page(page.object_list, number, page.paginator)
+    plain.is_cursor = True
+    plain.next_cursor = page.next_cursor
+    plain.previous_cursor = page.previous_cursor
+    return plain
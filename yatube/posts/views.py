@@ -1,76 +1,116 @@
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
 
+from . import lookups, queries, thumbnails
+from .freshness import (conditional_page, group_state, known_posts,
+                        post_state, profile_state)
+from .caching import cache_page_versioned
+from .counters import get_author_posts, get_stats
+from .feed import feed_posts
 from .forms import CommentForm, PostForm
-from .models import Comment, Follow, Group, Post, User
-from .utils import paginator
+from .models import Follow, Post
+from .parallel import gather, loaded
+from .search import search_posts
+from .utils import (COUNT_OF_COMMENTS, COUNT_OF_POSTS, CURSOR_PARAM,
+                    as_plain_page, cursor_paginator, paginator)
 
 
-@cache_page(20, key_prefix='index_page')
+@cache_page_versioned(key_prefix='index_page')
 def index(request):
     """Передаёт в шаблон posts/index.html
     десять последних объектов модели Post.
     """
-    post_list = (
-        Post.objects.select_related('group', 'author')
-    )
     context = {
-        'page_obj': paginator(post_list, request),
+        'page_obj': cursor_paginator(queries.index_posts(), request),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page(group_state)
 def group_posts(request, slug):
     """Передаёт в шаблон posts/group_list.html
     десять последних объектов модели Post.
     """
-    group = get_object_or_404(Group, slug=slug)
-    posts = (group.posts.select_related(
-        'group',
-        'author'
-    ))
+    group = lookups.get_group(slug)
     context = {
         'group': group,
-        'page_obj': paginator(posts, request)
+        'page_obj': cursor_paginator(queries.group_posts(group), request)
     }
 
     return render(request, 'posts/group_list.html', context)
 
 
+@conditional_page(profile_state)
 def profile(request, username):
     """страница для отображения данных об авторе"""
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
+    author = lookups.get_user(username)
+
+    def is_following():
+        return request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author
         ).exists()
-    else:
-        following = False
+
+    def posts_page():
+        count_of_posts = known_posts(request)
+        if count_of_posts is None:
+            count_of_posts = get_stats(author).posts
+        return count_of_posts, loaded(paginator(
+            queries.profile_posts(author), request, count=count_of_posts
+        ))
+
+    (count_of_posts, page_obj), following = gather(posts_page, is_following)
     context = {
-        'page_obj': paginator(post_list, request),
+        'page_obj': page_obj,
         'author': author,
-        'count_of_posts': post_list.count,
+        'count_of_posts': count_of_posts,
         'following': following
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page(post_state)
 def post_detail(request, post_id):
     """страница для отображения подробной информации о посте"""
-    one_post = get_object_or_404(Post, pk=post_id)
-    comments = Comment.objects.filter(post_id=post_id)
+    fetches = [
+        lambda: get_object_or_404(
+            Post.objects.select_related('author', 'group'), pk=post_id
+        ),
+        lambda: cursor_paginator(
+            queries.post_comments(post_id), request,
+            field='created', per_page=COUNT_OF_COMMENTS
+        ),
+    ]
+    # число постов автора обычно уже прочитано для условного GET
+    count_of_posts = known_posts(request)
+    if count_of_posts is None:
+        fetches.append(lambda: get_author_posts(post_id))
+    one_post, comments, *counted = gather(*fetches)
+    if counted:
+        count_of_posts = counted[0]
+    if count_of_posts is None:
+        count_of_posts = get_stats(one_post.author).posts
     form = CommentForm(request.POST or None)
     context = {
         'post': one_post,
-        'count_of_posts': one_post.author.posts.all().count(),
+        'count_of_posts': count_of_posts,
         'form': form,
         'comments': comments
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def search(request):
+    """поиск по тексту постов с сортировкой по релевантности"""
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_obj': search_posts(
+            query, request.GET.get(CURSOR_PARAM), COUNT_OF_POSTS
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
 def post_create(request):
     """создание новой записи (поста)."""
@@ -79,6 +119,10 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        if post.image:
+            thumbnails.queue(
+                post.image.name, thumbnails.post_geometries(post.image_width)
+            )
         return redirect('posts:profile', request.user)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -98,6 +142,10 @@ def post_edit(request, post_id):
         post = form.save(commit=False)
         post.author = request.user
         form.save()
+        if post.image and 'image' in form.changed_data:
+            thumbnails.queue(
+                post.image.name, thumbnails.post_geometries(post.image_width)
+            )
         return redirect('posts:post_detail', post_id=post_id)
     context = {
         'form': form,
@@ -121,15 +169,17 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    context = {'page_obj': paginator(posts, request)}
+    posts, keys = feed_posts(request.user)
+    context = {
+        'page_obj': as_plain_page(cursor_paginator(posts, request, keys=keys))
+    }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
 def profile_follow(request, username):
     """подписка на автора"""
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_user(username)
     if request.user != author:
         Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username=username)
@@ -138,6 +188,6 @@ def profile_follow(request, username):
 @login_required
 def profile_unfollow(request, username):
     """отписка от автора"""
-    author = get_object_or_404(User, username=username)
+    author = lookups.get_user(username)
     Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username=username)
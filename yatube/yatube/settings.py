@@ -11,21 +11,61 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+import sys
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
-CACHES = {
-    'default': {
+# Кэш выбирается переменной окружения YATUBE_CACHE:
+# locmem (по умолчанию), file, memcached, redis или tiered.
+# locmem у каждого процесса свой, для нескольких воркеров
+# нужен общий кэш: в locmem версии данных и страницы живут лишь
+# posts.caching.LOCAL_TIMEOUT секунд. tiered -- кэш процесса
+# перед общим кэшем, вид которого задает YATUBE_CACHE_SHARED
+# (по умолчанию redis).
+# Локальная замена Redis: python manage.py cache_server
+CACHE_LOCATION = os.getenv('YATUBE_CACHE_LOCATION')
+CACHE_BACKENDS = {
+    'locmem': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_LOCATION or os.path.join(BASE_DIR, 'cache'),
+    },
+    'memcached': {
+        'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+        'LOCATION': CACHE_LOCATION or '127.0.0.1:11211',
+    },
+    'redis': {
+        'BACKEND': 'core.cache.RespCache',
+        'LOCATION': CACHE_LOCATION or 'redis://127.0.0.1:6379/0',
+        'OPTIONS': {
+            'MAX_CONNECTIONS': 50,
+            'SOCKET_TIMEOUT': 1,
+        },
+    },
 }
-
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+CACHE_BACKEND = os.getenv('YATUBE_CACHE', 'locmem')
+if CACHE_BACKEND == 'tiered':
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.cache.TieredCache',
+            'OPTIONS': {
+                'L1': 'local',
+                'L2': 'shared',
+                'L1_TIMEOUT': 5,
+            },
+        },
+        'local': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'l1',
+            'OPTIONS': {'MAX_ENTRIES': 1000},
+        },
+        'shared': CACHE_BACKENDS[os.getenv('YATUBE_CACHE_SHARED', 'redis')],
     }
-}
+else:
+    CACHES = {'default': CACHE_BACKENDS[CACHE_BACKEND]}
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/2.2/howto/deployment/checklist/
@@ -67,6 +107,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,6 +115,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -81,7 +123,8 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 TEMPLATES = [
 
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени отрисовки для профилирования
+        'BACKEND': 'core.templates.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -98,17 +141,64 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
+# ASGI: views выполняются в пуле из ASGI_THREADS потоков, а медленные
+# клиенты ждут отправки запроса и получения ответа в цикле событий.
+ASGI_THREADS = int(os.getenv('YATUBE_ASGI_THREADS', 8))
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.sqlite3 -- SQLite с WAL, busy_timeout и BEGIN IMMEDIATE,
+# см. core/sqlite3/base.py. Соединения живут CONN_MAX_AGE секунд
+# и переиспользуются следующими запросами того же потока.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': int(os.getenv('YATUBE_CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'transaction_mode': 'IMMEDIATE',
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'mmap_size': 256 * 1024 * 1024,
+                'cache_size': -64 * 1024,
+            },
+        },
     }
 }
 
+# Реплики только для чтения: пути к файлам через запятую
+# в YATUBE_DB_REPLICAS, в базе PostgreSQL -- свои настройки подключения.
+# Страницы из REPLICA_VIEWS читаются с одной реплики на запрос,
+# запись идет в default. Остальные остаются на основной базе:
+# index кэшируется по версиям, group_list, profile, post_detail и API
+# отвечают 304 по ETag из версий, и данные отстающей реплики
+# закрепились бы под новой версией; формы и поиск читают то, что
+# пользователь только что изменил.
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), start=1
+):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# приложения, модели которых читаются с реплик
+REPLICA_APPS = ('posts',)
+REPLICA_VIEWS = (
+    'posts:follow_index',
+)
+# сколько секунд после изменения пользователь читает из основной базы
+REPLICA_STICKY_COOKIE = 'yatube_primary'
+REPLICA_STICKY_SECONDS = 10
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -150,3 +240,58 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Авторы, у которых подписчиков больше этого числа, не раздают посты
+# по лентам подписчиков: их посты подмешиваются в ленту при чтении.
+FEED_FANOUT_LIMIT = 1000
+# Когда автор перестает быть популярным, по лентам подписчиков
+# раздаются только столько его последних постов, в FEED_BACKFILL_WORKERS
+# фоновых потоках. При 0 -- сразу после коммита, в том же запросе.
+FEED_BACKFILL_POSTS = 100
+FEED_BACKFILL_WORKERS = 1
+
+# Число фоновых потоков, создающих миниатюры картинок постов.
+# При 0 миниатюры создаются сразу, в том же запросе.
+THUMBNAIL_WORKERS = 2
+# Хранилище ключей миниатюр: кэш перед базой и пакетная загрузка
+# записей для всех постов страницы.
+THUMBNAIL_KVSTORE = 'posts.kvstore.KVStore'
+
+# Загруженные картинки уменьшаются до IMAGE_MAX_SIZE пикселей
+# по большей стороне и пережимаются с качеством IMAGE_QUALITY.
+# При IMAGE_PROCESS_WORKERS > 0 -- в пуле процессов.
+IMAGE_MAX_SIZE = 2048
+IMAGE_QUALITY = 82
+IMAGE_PROCESS_WORKERS = 0
+
+# Независимые выборки страниц поста и профиля (пост, комментарии,
+# счетчики) идут одновременно в пуле из VIEW_FETCH_WORKERS потоков.
+# При 0 -- по очереди.
+VIEW_FETCH_WORKERS = 4
+
+# Доля запросов, для которых считаются SQL, шаблоны и кэш:
+# результат пишется в лог core.middleware и в заголовок Server-Timing.
+# В тестах выборка выключена, чтобы строки лога не попадали в вывод:
+# тесты профилирования включают ее сами.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+PROFILING_SAMPLE_RATE = 0 if TESTING else float(
+    os.getenv('YATUBE_PROFILING_SAMPLE_RATE', 0.01)
+)
+# С какого числа одинаковых SQL-запросов запрос считается N+1.
+PROFILING_DUPLICATE_THRESHOLD = 3
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'core.middleware': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}